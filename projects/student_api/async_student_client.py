@@ -0,0 +1,142 @@
+from typing import Iterable, List, Optional
+from student_client import base_url
+import asyncio
+import httpx
+
+# -------------------------
+
+# Response codes worth retrying: the server or a proxy in front of it is briefly unavailable
+RETRY_STATUSES = (502, 503, 504)
+
+# -------------------------
+
+class AsyncStudentClient:
+    """
+    Asyncio client for the student API.
+    - Keeps one httpx AsyncClient, so every request shares one pool of keep-alive connections.
+    - get_students_many fetches many students concurrently, with at most `concurrency`
+      requests in flight, and reports failures per ID instead of raising.
+    - Reads are retried on connection errors and 502/503/504 with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        base_url: str = base_url,
+        timeout: float = 30.0,
+        max_connections: int = 64,
+        retries: int = 3,
+        backoff_factor: float = 0.2,
+    ):
+        """
+        - base_url: The URL of the /students/ endpoint, ending in a slash.
+        - timeout: Seconds to wait for each request.
+        - max_connections: Size of the connection pool.
+        - retries: How many times a read is retried.
+        - backoff_factor: Base delay for retries; the delay doubles on every retry.
+        """
+        self.base_url = base_url
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    # Allow the client to be used in an async with statement, closing its connections at the end
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Close every pooled connection.
+        """
+        await self.client.aclose()
+
+    async def _get(self, path: str) -> httpx.Response:
+        """
+        Send a GET request to base_url + path, retrying transient failures.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.get(f"{self.base_url}{path}")
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    # -------------------------
+
+    async def get_student(self, student_id: str) -> dict:
+        """
+        Retrieve a specific student by their ID (raises httpx.HTTPStatusError for error responses).
+        """
+        response = await self._get(student_id)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_students_many(self, student_ids: Iterable[str], concurrency: int = 64) -> List[dict]:
+        """
+        Retrieve many students concurrently.
+        - At most concurrency requests are in flight at once.
+        - Returns one result per ID, in the order the IDs were given:
+          {"id": ..., "student": {...} or None, "error": None or a message}.
+        """
+        student_ids = list(student_ids)
+        results: List[Optional[dict]] = [None] * len(student_ids)
+        positions = iter(range(len(student_ids)))
+
+        async def worker():
+            # Each worker takes the next position until every ID has been fetched
+            for position in positions:
+                student_id = student_ids[position]
+                try:
+                    response = await self._get(student_id)
+                    if response.status_code == 200:
+                        results[position] = {"id": student_id, "student": response.json(), "error": None}
+                    else:
+                        results[position] = {"id": student_id, "student": None,
+                                             "error": f"{response.status_code}: {_error_detail(response)}"}
+                except (httpx.HTTPError, ValueError) as error:
+                    results[position] = {"id": student_id, "student": None, "error": repr(error)}
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(student_ids))))))
+        return results
+
+# -------------------------
+
+def _error_detail(response: httpx.Response) -> str:
+    """
+    Return the reason given by an error response.
+    - The API sends {"detail": ...}; a proxy may send any body, so anything else falls back
+      to the body text, or the reason phrase if the body is empty.
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    if isinstance(body, dict) and "detail" in body:
+        return body["detail"]
+    return response.text or response.reason_phrase
+
+def get_students_many(student_ids: Iterable[str], concurrency: int = 64, **client_options) -> List[dict]:
+    """
+    Retrieve many students concurrently from synchronous code.
+    - Runs AsyncStudentClient.get_students_many in a new event loop and returns its results.
+    """
+    async def fetch():
+        async with AsyncStudentClient(max_connections=concurrency, **client_options) as client:
+            return await client.get_students_many(student_ids, concurrency=concurrency)
+    return asyncio.run(fetch())
+
+# -------------------------
+
+# Example usage: fetch students 1 to 100 and report how many were found
+if __name__ == "__main__":
+    results = get_students_many([str(number) for number in range(1, 101)], concurrency=16)
+    found = sum(1 for result in results if result["student"] is not None)
+    print(f"Found {found} of {len(results)} students.")
@@ -1,24 +1,323 @@
 import tkinter as tk
 from tkinter import ttk
+from concurrent.futures import ThreadPoolExecutor
+from student_client import StudentClient, base_url
+import queue
 import requests
 
-# Define the base URL for the API endpoints
-base_url = "http://127.0.0.1:8000/students/"
+# Number of students fetched from the API at a time
+PAGE_SIZE = 200
+# Number of pages kept in the Treeview; pages further away from the view are dropped
+MAX_PAGES = 3
+# Load the next (or previous) page when the view is this close to the end (or start) of the rows held
+SCROLL_MARGIN = 0.15
+# Milliseconds between checks for results from the background fetcher
+POLL_INTERVAL_MS = 50
 
-def fetch_students():
+# Shared client, so every page request reuses the same keep-alive connection
+# It is only used from the fetcher thread below.
+client = StudentClient(base_url)
+
+def fetch_students(after=None, limit=PAGE_SIZE, etag=None):
     """
-    Fetch all students from the FastAPI backend.
-    - Sends a GET request to the /students/ endpoint.
-    - Returns the list of students in JSON format.
+    Fetch one page of students from the FastAPI backend.
+    - Sends a GET request to the /students/ endpoint with limit and after.
+    - etag: The ETag of this page from an earlier fetch; the server answers 304 if it is unchanged.
+    - Returns (students or None if unchanged, cursor of the next page, ETag), or None on error.
+    - Runs on the fetcher thread, never on the Tk thread.
     """
+    params = {"limit": limit}
+    if after is not None:
+        params["after"] = after
+    headers = {"If-None-Match": etag} if etag else {}
     try:
-        response = requests.get(base_url)
+        response = client.send("GET", params=params, headers=headers)
+        if response.status_code == 304:
+            return None, response.headers.get("X-Next-After"), etag
         response.raise_for_status()  # Raise an exception for HTTP errors
-        print("Students fetched successfully")
-        return response.json()  # Return the list of students
+        students = response.json()
+        print(f"Fetched {len(students)} students")
+        return students, response.headers.get("X-Next-After"), response.headers.get("ETag")
     except requests.RequestException as e:
         print(f"Error fetching students: {e}")
-        return []
+        return None
+
+def _row(student):
+    """
+    Return the Treeview values shown for a student.
+    """
+    return (student["id"], student["firstName"], student["lastName"], student["email"])
+
+class PagedStudentTable:
+    """
+    Shows students in a Treeview that only holds a window of pages.
+    - Pages are fetched with keyset pagination as the user scrolls towards either end of the window.
+    - The window holds at most MAX_PAGES pages; the page furthest from the view is dropped,
+      so the Treeview stays small however many students there are.
+    - The cursor of every page seen so far is remembered, so scrolling back up fetches
+      earlier pages again.
+    - The scrollbar reflects the rows currently held, not the whole roster.
+    - All network I/O runs on one background thread. Results are queued and applied on the
+      Tk thread by a root.after poll, so the window never waits for the server.
+    - Rows are Treeview items whose iid is the student ID, which is also the key the
+      server stores and pages the student under.
+    - A refresh asked for while a fetch is running is remembered and run once it finishes.
+    """
+
+    def __init__(self, root, tree, scrollbar):
+        self.root = root
+        self.tree = tree
+        self.scrollbar = scrollbar
+        # cursors[n] is the "after" cursor that fetches page n
+        self.cursors = [None]
+        # Number of the first page held, and the student IDs of each page held
+        self.first_page = 0
+        self.pages = []
+        # Values shown for every student held, and the (cursor, ETag) each page was fetched with
+        self.values = {}
+        self.etags = {}
+        # Whether the page after the last one held exists
+        self.more = False
+        # Whether a fetch is running; only one runs at a time
+        self.busy = False
+        # Whether a refresh was asked for while a fetch was running
+        self.refresh_pending = False
+        self.fetcher = ThreadPoolExecutor(max_workers=1)
+        self.results = queue.Queue()
+        tree.configure(yscrollcommand=self.on_scroll)
+        root.after(POLL_INTERVAL_MS, self._poll)
+
+    # -------------------------
+
+    def _run(self, fetch, apply):
+        """
+        Run fetch() on the fetcher thread, then apply(result) on the Tk thread.
+        - Returns False without doing anything if another fetch is still running.
+        """
+        if self.busy:
+            return False
+        self.busy = True
+
+        def job():
+            try:
+                result = fetch()
+            except Exception as e:
+                print(f"Error fetching students: {e}")
+                result = None
+            self.results.put((apply, result))
+
+        self.fetcher.submit(job)
+        return True
+
+    def _poll(self):
+        """
+        Apply finished fetches on the Tk thread, then check again after POLL_INTERVAL_MS.
+        """
+        try:
+            while True:
+                apply, result = self.results.get_nowait()
+                self.busy = False
+                apply(result)
+        except queue.Empty:
+            pass
+        finally:
+            if self.refresh_pending and not self.busy:
+                # Run the refresh the user asked for while the last fetch was running
+                self.refresh_pending = False
+                self.refresh()
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    # -------------------------
+
+    def _top_row(self):
+        """
+        Return the item at the top of the view, or None if the Treeview is empty.
+        """
+        children = self.tree.get_children()
+        if not children:
+            return None
+        return children[min(len(children) - 1, round(self.tree.yview()[0] * len(children)))]
+
+    def _keep_view(self, anchor):
+        """
+        Scroll so the row that was at the top of the view stays there after rows were
+        added or removed above it.
+        """
+        children = len(self.tree.get_children())
+        if anchor is not None and children and self.tree.exists(anchor):
+            self.tree.yview_moveto(self.tree.index(anchor) / children)
+
+    def _insert(self, students, index):
+        """
+        Insert students at a position in the Treeview and return their IDs.
+        """
+        ids = []
+        for offset, student in enumerate(students):
+            values = _row(student)
+            self.values[student["id"]] = values
+            self.tree.insert("", index if index == tk.END else index + offset, iid=student["id"], values=values)
+            ids.append(student["id"])
+        return ids
+
+    def _drop(self, ids):
+        """
+        Remove one page's students from the Treeview.
+        """
+        self.tree.delete(*ids)
+        for student_id in ids:
+            del self.values[student_id]
+
+    def _remember(self, page, result):
+        """
+        Record the cursor and ETag returned with a page.
+        """
+        _, next_after, etag = result
+        self.etags[page] = (self.cursors[page], etag)
+        if next_after is not None and self.cursors[page + 1:page + 2] != [next_after]:
+            # The pages after this one start somewhere else now; forget their old cursors
+            del self.cursors[page + 1:]
+            self.cursors.append(next_after)
+        return next_after is not None
+
+    # -------------------------
+
+    def load_next(self):
+        """
+        Append the page after the window, dropping the first page if the window is full.
+        """
+        page = self.first_page + len(self.pages)
+
+        def apply(result):
+            if result is None:
+                return
+            students = result[0]
+            self.more = self._remember(page, result)
+            anchor = self._top_row()
+            self.pages.append(self._insert(students, tk.END))
+            if not self.tree.get_children():
+                print("No students data to display.")
+            if len(self.pages) > MAX_PAGES:
+                self._drop(self.pages.pop(0))
+                self.first_page += 1
+                self._keep_view(anchor)
+
+        self._run(lambda: fetch_students(self.cursors[page]), apply)
+
+    def load_previous(self):
+        """
+        Prepend the page before the window, dropping the last page if the window is full.
+        """
+        page = self.first_page - 1
+
+        def apply(result):
+            if result is None:
+                return
+            self._remember(page, result)
+            anchor = self._top_row()
+            self.pages.insert(0, self._insert(result[0], 0))
+            self.first_page = page
+            if len(self.pages) > MAX_PAGES:
+                self._drop(self.pages.pop())
+                self.more = True
+            self._keep_view(anchor)
+
+        self._run(lambda: fetch_students(self.cursors[page]), apply)
+
+    def refresh(self):
+        """
+        Re-fetch the pages in the window and apply only what changed.
+        - Each page is sent with the ETag it was last fetched with; if every page comes back
+          304 Not Modified, the Treeview is left untouched.
+        - Otherwise students are inserted, updated and removed by ID, so unchanged rows stay put.
+        - If a fetch is running, the refresh runs as soon as it finishes.
+        """
+        if self.busy:
+            self.refresh_pending = True
+            return
+        if not self.pages:
+            self.load_next()
+            return
+        first_page, count = self.first_page, len(self.pages)
+        cursor = self.cursors[first_page]
+        etags = dict(self.etags)
+
+        def fetch():
+            # Walk the window from its first cursor, sending the old ETag while the cursors still match
+            pages, after = [], cursor
+            for page in range(first_page, first_page + count):
+                known = etags.get(page)
+                result = fetch_students(after, etag=known[1] if known and known[0] == after else None)
+                if result is None:
+                    return None
+                pages.append((after, result))
+                after = result[1]
+                if after is None:
+                    break
+            return pages
+
+        self._run(fetch, lambda pages: self._apply_refresh(first_page, pages))
+
+    def _apply_refresh(self, first_page, pages):
+        """
+        Apply re-fetched window pages to the Treeview.
+        """
+        if pages is None or first_page != self.first_page:
+            # The fetch failed, or the window moved while it ran
+            return
+        if len(pages) == len(self.pages) and all(result[0] is None for _, result in pages):
+            print("No changes")
+            return
+        # Build the new window: unchanged pages keep the rows already shown
+        new_pages, new_values = [], {}
+        for offset, (after, (students, next_after, etag)) in enumerate(pages):
+            if students is None:
+                rows = [self.values[student_id] for student_id in self.pages[offset]]
+            else:
+                rows = [_row(student) for student in students]
+            # A write between two page fetches can move a student onto the next page; show it once
+            rows = [row for row in rows if row[0] not in new_values]
+            new_values.update((row[0], row) for row in rows)
+            new_pages.append([row[0] for row in rows])
+        anchor = self._top_row()
+        removed = [student_id for student_id in self.values if student_id not in new_values]
+        if removed:
+            self.tree.delete(*removed)
+        # Both windows are in ID order, so walking the new one in order places every insert correctly
+        position, inserted, updated = 0, 0, 0
+        for ids in new_pages:
+            for student_id in ids:
+                values = new_values[student_id]
+                old = self.values.get(student_id)
+                if old is None:
+                    self.tree.insert("", position, iid=student_id, values=values)
+                    inserted += 1
+                elif old != values:
+                    self.tree.item(student_id, values=values)
+                    updated += 1
+                position += 1
+        print(f"Refreshed: {inserted} inserted, {updated} updated, {len(removed)} removed")
+        self.values = new_values
+        self.pages = new_pages
+        for offset, (after, result) in enumerate(pages):
+            self.cursors[first_page + offset] = after
+            self.more = self._remember(first_page + offset, result)
+        self._keep_view(anchor if anchor not in removed else None)
+
+    # -------------------------
+
+    def on_scroll(self, first, last):
+        """
+        Update the scrollbar and fetch another page when the view nears either end of the window.
+        - Called by the Treeview whenever its view changes (mouse wheel, keys or scrollbar).
+        - Does nothing while a fetch is running; the next scroll event tries again.
+        """
+        self.scrollbar.set(first, last)
+        if self.busy or not self.pages:
+            return
+        if float(last) >= 1.0 - SCROLL_MARGIN and self.more:
+            self.load_next()
+        elif float(first) <= SCROLL_MARGIN and self.first_page > 0:
+            self.load_previous()
 
 # Create the main application window
 root = tk.Tk()
@@ -29,26 +328,28 @@ frame = ttk.Frame(root, padding="10")
 frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
 # Create a Treeview widget for displaying the list of students
-tree = ttk.Treeview(frame, columns=("ID", "First Name", "Last Name", "Email"), show='headings')
+tree = ttk.Treeview(frame, columns=("ID", "First Name", "Last Name", "Email"), show='headings', height=20)
 tree.heading("ID", text="ID")
 tree.heading("First Name", text="First Name")
 tree.heading("Last Name", text="Last Name")
 tree.heading("Email", text="Email")
 tree.grid(row=0, column=0, sticky=(tk.W, tk.E))
 
+# Create a scrollbar for the Treeview
+scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+# The table fetches pages of students in the background as the user scrolls
+table = PagedStudentTable(root, tree, scrollbar)
+
 def load_students():
     """
     Load students from the FastAPI backend and display them in the Treeview.
+    - The first call fetches the first page; later calls re-check the pages shown and
+      apply only the students that changed.
+    - Returns immediately; the Treeview is updated when the fetch finishes.
     """
-    # Clear existing items in the Treeview
-    for item in tree.get_children():
-        tree.delete(item)
-    
-    students = fetch_students()
-    if not students:
-        print("No students data to display.")
-    for student in students:
-        tree.insert("", tk.END, values=(student["id"], student["firstName"], student["lastName"], student["email"]))
+    table.refresh()
 
 # Load students on application start
 load_students()
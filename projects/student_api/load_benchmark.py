@@ -0,0 +1,225 @@
+from concurrent.futures import ThreadPoolExecutor
+from memory_benchmark import make_student
+import argparse
+import datetime
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import resource
+import threading
+import time
+
+# Keep the application's per-request logging out of the measurements
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+# -------------------------
+
+class ClientFactory:
+    """
+    Hands out one HTTP client per benchmark thread.
+    - With a URL, clients are requests sessions talking to a running server.
+    - Without one, clients are FastAPI TestClients calling the application in this process.
+    """
+
+    def __init__(self, url: str = None):
+        self.url = url
+        self.local = threading.local()
+        self.app = None
+        if url is None:
+            from main import app
+            self.app = app
+
+    def client(self):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            if self.app is not None:
+                from fastapi.testclient import TestClient
+                client = TestClient(self.app)
+            else:
+                import requests
+                client = requests.Session()
+            self.local.client = client
+        return client
+
+    def request(self, method: str, path: str, **kwargs):
+        base = self.url.rstrip("/") if self.url else ""
+        return self.client().request(method, base + path, **kwargs)
+
+# -------------------------
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Return the nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def peak_rss_mb(server_pid: int = None) -> float:
+    """
+    Return the peak resident set size in megabytes.
+    - Reads the server's VmHWM when a server PID is given, otherwise this process's own peak.
+    """
+    if server_pid is not None:
+        with open(f"/proc/{server_pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_phase(factory: ClientFactory, make_request, total: int, concurrency: int) -> dict:
+    """
+    Send total requests from concurrency threads and summarise them.
+    - make_request(factory, number) sends request number and returns its response.
+    - A response counts as an error unless its status code is below 400.
+    """
+    counter = itertools.count()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            number = next(counter)
+            if number >= total:
+                return
+            start = time.perf_counter()
+            try:
+                ok = make_request(factory, number).status_code < 400
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors.append(number)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    duration = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "duration_s": round(duration, 4),
+        "throughput_rps": round(total / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+# -------------------------
+
+def run(args) -> list:
+    """
+    Grow the store through each size tier and benchmark the endpoints at each one.
+    """
+    factory = ClientFactory(args.url)
+    rng = random.Random(args.seed)
+    results = []
+    seeded = 0
+    for size in sorted(args.sizes):
+        # create_students_batch: add students in batches until the store reaches this size
+        batches = []
+        while seeded < size:
+            count = min(args.batch_size, size - seeded)
+            batches.append([make_student(args.id_offset + number, rng) for number in range(seeded, seeded + count)])
+            seeded += count
+        if batches:
+            phase = run_phase(factory, lambda f, n: f.request("POST", "/students/", json=batches[n]),
+                              len(batches), args.concurrency)
+            phase["students_per_s"] = round(sum(len(batch) for batch in batches) / phase["duration_s"], 2)
+            results.append(_result(args, size, "create_students_batch", phase))
+
+        def random_id():
+            return f"{args.id_offset + rng.randrange(size):08d}"
+
+        # get_student: random single reads
+        phase = run_phase(factory, lambda f, n: f.request("GET", f"/students/{random_id()}"),
+                          args.requests, args.concurrency)
+        results.append(_result(args, size, "get_student", phase))
+
+        # get_students: random keyset pages
+        phase = run_phase(factory, lambda f, n: f.request("GET", "/students/",
+                                                          params={"limit": args.page_size, "after": random_id()}),
+                          args.requests, args.concurrency)
+        results.append(_result(args, size, f"get_students?limit={args.page_size}", phase))
+
+        # get_students: the full list
+        phase = run_phase(factory, lambda f, n: f.request("GET", "/students/"),
+                          args.full_list_requests, args.concurrency)
+        results.append(_result(args, size, "get_students", phase))
+    return results
+
+def _result(args, size: int, endpoint: str, phase: dict) -> dict:
+    result = {"size": size, "endpoint": endpoint, **phase, "peak_rss_mb": round(peak_rss_mb(args.server_pid), 1)}
+    print(f"{size:>9} {endpoint:<28} {result['throughput_rps']:>10.1f} rps  p50 {result['p50_ms']:>8.2f} ms  "
+          f"p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']:>4}  "
+          f"peak RSS {result['peak_rss_mb']:>8.1f} MB")
+    return result
+
+def compare(results: list, baseline_path: str):
+    """
+    Print the change in throughput and p99 latency against an earlier results file.
+    """
+    with open(baseline_path) as baseline_file:
+        baseline = {(r["size"], r["endpoint"]): r for r in json.load(baseline_file)["results"]}
+    print("\nChange against", baseline_path)
+    for result in results:
+        before = baseline.get((result["size"], result["endpoint"]))
+        if before is None or not before["throughput_rps"] or not before["p99_ms"]:
+            continue
+        throughput = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100
+        p99 = (result["p99_ms"] / before["p99_ms"] - 1) * 100
+        print(f"{result['size']:>9} {result['endpoint']:<28} throughput {throughput:+7.1f}%  p99 {p99:+7.1f}%")
+
+# -------------------------
+
+def main():
+    """
+    Benchmark create_students_batch, get_student and get_students as the store grows.
+    - Runs against the application in this process, or against a running server with --url
+      (start it with an empty store; pass --server-pid to report the server's peak RSS).
+    - Writes every measurement to a JSON file for comparison between runs.
+    """
+    parser = argparse.ArgumentParser(description="Load and latency benchmark for the student API.")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=[10_000, 100_000, 1_000_000], help="comma-separated store sizes")
+    parser.add_argument("--concurrency", type=int, default=8, help="number of concurrent client threads")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per read phase")
+    parser.add_argument("--full-list-requests", type=int, default=20, help="requests for the full student list")
+    parser.add_argument("--batch-size", type=int, default=5000, help="students per create request")
+    parser.add_argument("--page-size", type=int, default=100, help="limit for paginated list requests")
+    parser.add_argument("--url", help="base URL of a running server, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--server-pid", type=int, help="PID of the server, for its peak RSS")
+    parser.add_argument("--id-offset", type=int, default=0, help="first synthetic student number")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", default="load_benchmark_results.json", help="file to write results to")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.output, "w") as output:
+        json.dump({
+            "started": datetime.datetime.now().isoformat(timespec="seconds"),
+            "mode": "server" if args.url else "in-process",
+            "python": platform.python_version(),
+            "storage": os.environ.get("STUDENT_STORAGE", "memory"),
+            "concurrency": args.concurrency,
+            "results": results,
+        }, output, indent=2)
+    print("Results written to", args.output)
+    if args.baseline:
+        compare(results, args.baseline)
+
+# -------------------------
+
+# Entry point to run the benchmark
+if __name__ == "__main__":
+    main()
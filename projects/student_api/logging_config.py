@@ -0,0 +1,114 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from contextvars import ContextVar
+from fastapi.routing import APIRoute
+import atexit
+import logging
+import os
+import queue
+import random
+
+# -------------------------
+
+# Name of the route handling the current request (its handler's name), set by SampledRoute
+# Sync handlers and run_in_threadpool calls run in a copy of the request's context, so
+# records logged from them see it too.
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+class SampledRoute(APIRoute):
+    """
+    Route that records its name in current_route while its request is handled.
+    - Set as the application's route_class before any route is declared.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        name = self.name
+
+        async def route_handler(request):
+            token = current_route.set(name)
+            try:
+                return await handler(request)
+            finally:
+                current_route.reset(token)
+
+        return route_handler
+
+# -------------------------
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves message formatting to the listener thread.
+    - The standard QueueHandler formats every record before queueing it; this one queues
+      the record as is, so a request thread only pays for building the LogRecord.
+    - Log calls must pass arguments separately (logging.info("... %s", value)) so the
+      message is only built for records that are written.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+# -------------------------
+
+class SamplingFilter(logging.Filter):
+    """
+    Filter that keeps only a sample of low-severity records.
+    - Records at WARNING or above are always kept, so errors are never lost.
+    - Other records are kept with the rate configured for the route of the request being
+      handled (see SampledRoute), e.g. "get_student", wherever in the request the record is
+      logged from. Records logged outside a request are keyed by the function that logged
+      them. Anything without a configured rate is kept with default_rate.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, default_rate: float = 1.0):
+        super().__init__()
+        self.rates = rates or {}
+        self.default_rate = default_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(current_route.get() or record.funcName, self.default_rate)
+        return rate >= 1.0 or random.random() < rate
+
+# -------------------------
+
+def parse_rates(value: str) -> Dict[str, float]:
+    """
+    Parse sampling rates written as "get_student=0.01,get_students=0.1".
+    """
+    rates = {}
+    for item in value.split(","):
+        if item.strip():
+            name, rate = item.split("=")
+            rates[name.strip()] = float(rate)
+    return rates
+
+def configure_logging() -> QueueListener:
+    """
+    Set up non-blocking, sampled logging for the application.
+    - Log calls put records on an in-memory queue; a background listener thread formats
+      them and writes them to stderr.
+    - LOG_LEVEL sets the root level (default INFO).
+    - LOG_SAMPLE_RATES sets per-route sampling rates, e.g. "get_student=0.01".
+    - LOG_DEFAULT_SAMPLE_RATE sets the rate for everything else (default 1.0).
+    - Returns the started listener; it is stopped (and the queue drained) at exit.
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(
+        parse_rates(os.environ.get("LOG_SAMPLE_RATES", "")),
+        float(os.environ.get("LOG_DEFAULT_SAMPLE_RATE", "1.0")),
+    ))
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+
+    root = logging.getLogger()
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    root.handlers = [queue_handler]
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -1,101 +1,437 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, EmailStr
-from typing import List, Dict
+from fastapi import Body, FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError, model_validator
+from typing import List, Optional
+from student_models import Email, Student
+from student_store import StudentStore
+from student_storage import open_engine
+from student_sqlite import SqliteStudentStore
+from student_changes import CHANGE_DELETE
+from student_cache import StudentResponseCache, etag_matches, make_etag
+from logging_config import SampledRoute, configure_logging
+from contextlib import asynccontextmanager, contextmanager
 import datetime
+import gc
+import json
 import logging
+import os
+import threading
+
+# Close the storage engine when the application shuts down
+# This makes sure every logged write is fsynced before the process exits
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    students_db.close()
 
 # Initialize the FastAPI application
 # This creates a new FastAPI application instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# Routes record their name for per-route log sampling (see logging_config)
+app.router.route_class = SampledRoute
 
 # -------------------------
 
 # Configure logging
 # Set up logging to capture information, errors, etc.
-logging.basicConfig(level=logging.INFO)
+# Records are queued and written by a background thread; see logging_config
+# for the environment variables that control the level and sampling.
+configure_logging()
+
+# -------------------------
+
+def open_store():
+    """
+    Create the student store selected by the STUDENT_STORAGE environment variable.
+    - "memory" (default) or "log": a StudentStore in this process's memory, optionally
+      backed by a write-ahead log (see student_storage). Only safe with one worker.
+    - "sqlite": a SqliteStudentStore in the file STUDENT_DB_PATH (default ./students.db),
+      shared consistently by every worker, e.g. uvicorn main:app --workers 4.
+    """
+    if os.environ.get("STUDENT_STORAGE") == "sqlite":
+        return SqliteStudentStore(Student, os.environ.get("STUDENT_DB_PATH", "./students.db"))
+    return StudentStore(Student, engine=open_engine())
+
+# In-memory storage for student records
+# This store keeps student records keyed by student ID, along with a sorted
+# ID list for keyset pagination and secondary indexes for searching.
+students_db = open_store()
+students_db.load()
+
+# Cache of encoded response bodies and their ETags
+# Write endpoints invalidate the students they change.
+response_cache = StudentResponseCache(students_db)
+
+# Media type used to stream students one JSON object per line
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Validator for the body of a batch POST
+# Parses and validates the raw JSON of the whole list in one pydantic-core call.
+STUDENT_LIST = TypeAdapter(List[Student])
+
+# Batch requests running with the cyclic garbage collector paused (see gc_paused)
+_gc_pauses = 0
+_gc_was_enabled = False
+_gc_lock = threading.Lock()
+
+@contextmanager
+def gc_paused():
+    """
+    Pause the cyclic garbage collector while a large batch is validated and stored.
+    - A batch of 100k students allocates several hundred thousand objects, which sets off
+      collections that walk the whole store; that cost more than storing the batch. The
+      objects hold no reference cycles, so pausing frees nothing late.
+    - Overlapping batches share the pause; the last one to finish resumes the collector,
+      unless it was already disabled.
+    """
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_lock:
+            _gc_pauses -= 1
+            if _gc_pauses == 0 and _gc_was_enabled:
+                gc.enable()
+
+# Number of IDs copied out of the sorted ID list at a time while streaming
+STREAM_CHUNK_SIZE = 1000
+
+# Seconds between keep-alive comments on an idle change stream
+# Stops proxies from closing the connection while no student changes.
+CHANGE_STREAM_KEEPALIVE = 15.0
 
 # -------------------------
 
-# Define the Student model using Pydantic
-class Student(BaseModel):
+# Define the model for one item of a bulk PATCH
+# Only the id is required; every other field given replaces the stored value.
+class StudentPatch(BaseModel):
     id: str
-    firstName: str
-    middleName: str  
-    lastName: str
-    # Date of birth in YYYY-MM-DD format
-    dateOfBirth: datetime.date
-    phoneNumber: str
-    email: EmailStr
-    module: str
-    enrollmentDate: datetime.date
+    firstName: Optional[str] = None
+    middleName: Optional[str] = None
+    lastName: Optional[str] = None
+    dateOfBirth: Optional[datetime.date] = None
+    phoneNumber: Optional[str] = None
+    email: Optional[Email] = None
+    module: Optional[str] = None
+    enrollmentDate: Optional[datetime.date] = None
+
+    @model_validator(mode="after")
+    def check_required_fields(self):
+        # Every field of a student must have a value, so none can be cleared
+        for field in self.model_fields_set - {"id"}:
+            if getattr(self, field) is None:
+                raise ValueError(f"{field} cannot be null.")
+        return self
+
+# Define the per-student result of a bulk PATCH or DELETE
+class StudentBulkResult(BaseModel):
+    id: str
+    # "updated" or "deleted"
+    status: str
+    # The student after the update, or as it was before deletion
+    student: Student
 
 # -------------------------
 
-# In-memory storage for student records
-# This dictionary will store student records. The key is the student ID.
-students_db: Dict[str, Student] = {}  
+# Define the response model for student searches
+class StudentSearchResult(BaseModel):
+    # Total number of students matching the search
+    count: int
+    # The matching students (limited by the request's limit)
+    results: List[Student]
+
+# -------------------------
+
+# Define one entry of the change feed
+class StudentChange(BaseModel):
+    # Sequence number of the change; pass the last one seen as since to continue
+    seq: int
+    # "create", "update" or "delete"
+    op: str
+    id: str
+    # The student as it is now, for creates and updates of students that still exist
+    student: Optional[Student] = None
+
+# Define the response model for the change feed
+class StudentChanges(BaseModel):
+    # Sequence number of the newest change in the store
+    latest: int
+    # Changes after since, oldest first
+    changes: List[StudentChange]
+    # Cursor for the next request: the last change returned, or since if there were none
+    next: int
+
+# -------------------------
+
+def _cached_response(request: Request, cached, headers: Optional[dict] = None) -> Response:
+    """
+    Build a response from a cached (body, ETag) pair.
+    - Returns 304 with no body if the request's If-None-Match header matches the ETag.
+    - headers: Extra headers sent with both the 200 and the 304 response.
+    """
+    body, etag = cached
+    headers = {**(headers or {}), "ETag": etag}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _stream_students(after: Optional[str], limit: Optional[int]):
+    """
+    Yield students as NDJSON lines in ID order.
+    - Copies at most STREAM_CHUNK_SIZE IDs at a time so memory use stays flat.
+    - Re-seeks by the last ID sent, so writes made while streaming do not skip or repeat records.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        chunk_size = STREAM_CHUNK_SIZE if remaining is None else min(remaining, STREAM_CHUNK_SIZE)
+        page = students_db.page(after, chunk_size)
+        if not page:
+            break
+        yield "".join(student.model_dump_json() + "\n" for _, student in page)
+        after = page[-1][0]
+        if remaining is not None:
+            remaining -= len(page)
+
+def _describe_changes(changes) -> List[dict]:
+    """
+    Turn (sequence number, kind, student ID) changes into change feed entries.
+    - Creates and updates carry the student as it is now. If it has been deleted since,
+      a later delete entry follows.
+    """
+    return [
+        {"seq": seq, "op": kind, "id": student_id,
+         "student": students_db.get(student_id) if kind != CHANGE_DELETE else None}
+        for seq, kind, student_id in changes
+    ]
+
+def _change_event(change: dict) -> str:
+    """
+    Encode one change feed entry as a Server-Sent Event.
+    """
+    data = StudentChange.model_construct(**change).model_dump_json()
+    return f"id: {change['seq']}\nevent: {change['op']}\ndata: {data}\n\n"
+
+async def _stream_changes(request: Request, since: int):
+    """
+    Yield Server-Sent Events for every change after since, as they happen.
+    - If since is too old, sends a "reset" event with the newest sequence number; the client
+      should re-read the full list and carry on from there.
+    - Sends a comment every CHANGE_STREAM_KEEPALIVE seconds while nothing changes.
+    - Stops when the client disconnects.
+    """
+    while not await request.is_disconnected():
+        changes = students_db.changes_since(since, STREAM_CHUNK_SIZE)
+        if changes is None:
+            since = students_db.latest_change()
+            yield f"id: {since}\nevent: reset\ndata: {json.dumps({'latest': since})}\n\n"
+        elif changes:
+            yield "".join(_change_event(change) for change in _describe_changes(changes))
+            since = changes[-1][0]
+        elif not await students_db.wait_for_change(since, CHANGE_STREAM_KEEPALIVE):
+            yield ": keep-alive\n\n"
 
 # -------------------------
 
 # Endpoint to create a batch of students
-@app.post("/students/", response_model=List[Student])
-def create_students_batch(students: List[Student]):
+# The body is read as bytes and validated by STUDENT_LIST, so the schema is given here
+@app.post(
+    "/students/",
+    response_model=List[Student],
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {
+        "schema": {"type": "array", "items": {"$ref": "#/components/schemas/Student"}}
+    }}}},
+)
+async def create_students_batch(request: Request):
     """
-    Create a batch of new students.
+    Create a batch of new students, all or nothing.
     - Accepts a list of students.
-    - Checks if each student's ID already exists.
-    - If not, adds the student to the in-memory database.
+    - Validates the raw JSON body in one pass with STUDENT_LIST, in the thread pool,
+      instead of letting FastAPI decode it and validate it item by item. Email addresses
+      are checked by student_models.Email, which checks each distinct domain only once.
+    - Garbage collection is paused while the batch is validated and stored (see gc_paused).
+    - Checks every ID against the database and the rest of the batch in one pass.
+    - If any ID conflicts, nothing is added and a 400 error lists every conflict
+      with its position in the batch, its ID and the reason.
+    - Otherwise adds every student to the in-memory database at once.
     - Returns the list of created students.
     """
-    # List to keep track of students successfully created
-    created_students = []  
-    for student in students:
-        if student.id in students_db:
-            # Log an error if ID already exists
-            logging.error(f"Student ID {student.id} already exists.")
-            # Return error response
-            raise HTTPException(status_code=400, detail=f"Student ID {student.id} already exists.")
-        # Add student to in-memory database
-        students_db[student.id] = student
-        # Add to the list of created students
-        created_students.append(student)
-        # Log successful creation
-        logging.info(f"Created student with ID {student.id}")
+    body = await request.body()
+    return await run_in_threadpool(_create_students, body)
+
+def _create_students(body: bytes):
+    with gc_paused():
+        # Validate the whole body, reporting errors the way FastAPI does
+        try:
+            students = STUDENT_LIST.validate_json(body)
+        except ValidationError as error:
+            raise RequestValidationError(
+                [{**detail, "loc": ("body", *detail["loc"])} for detail in error.errors(include_url=False)]
+            )
+        # Add the whole batch, or nothing if any ID conflicts
+        conflicts = students_db.add_many(students)
+    if conflicts:
+        # Log one error for the rejected batch
+        logging.error("Rejected batch of %d students: %d conflicting IDs.", len(students), len(conflicts))
+        # Return an error response reporting every conflict
+        raise HTTPException(
+            status_code=400,
+            detail=[{"index": index, "id": student_id, "error": reason} for index, student_id, reason in conflicts],
+        )
+    # Drop the cached full list, which no longer includes every student
+    response_cache.invalidate(student.id for student in students)
+    # Log one line for the whole batch
+    logging.info("Created %d students.", len(students))
     # Return the list of created students
-    return created_students
+    return students
 
 # -------------------------
 
 # Endpoint to get all students
 @app.get("/students/", response_model=List[Student])
-def get_students():
+def get_students(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1),
+    after: Optional[str] = None,
+):
     """
-    Retrieve all students from the in-memory database.
-    - Returns a list of all students.
+    Retrieve students from the in-memory database in ID order.
+    - limit: The maximum number of students to return. Returns all students if not given.
+    - after: Only return students whose ID sorts after this ID (keyset cursor).
+    - If the Accept header asks for application/x-ndjson, streams one student per line.
+    - Otherwise returns a JSON list and sets X-Next-After when more students remain.
+    - The full list (no limit or after) is served from the response cache with an ETag.
+    - Pages carry an ETag of their contents too, so clients can re-check a page cheaply.
+    - Returns 304 when If-None-Match matches the ETag.
     """
     # Log the number of students being retrieved
-    logging.info(f"Retrieving all students. Total count: {len(students_db)}")
-    # Return all students as a list
-    return list(students_db.values())
+    logging.info("Retrieving students. Total count: %d", len(students_db))
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        # Stream the students instead of building the whole list in memory
+        return StreamingResponse(_stream_students(after, limit), media_type=NDJSON_MEDIA_TYPE)
+    if limit is None and after is None:
+        # Serve the full list from the response cache
+        return _cached_response(request, response_cache.everyone())
+    page = students_db.page(after, limit)
+    headers = {}
+    if limit is not None and page and page[-1][0] != students_db.last_id():
+        # Tell the client where the next page starts
+        headers["X-Next-After"] = page[-1][0]
+    # Return the page of students as a list, with an ETag of its contents
+    body = ("[" + ",".join(student.model_dump_json() for _, student in page) + "]").encode()
+    return _cached_response(request, (body, make_etag(body)), headers)
+
+# -------------------------
+
+# Endpoint to read the change feed
+# Declared before /students/{student_id} so "changes" is not taken as a student ID
+@app.get("/students/changes", response_model=StudentChanges)
+def get_changes(since: Optional[int] = None, limit: int = Query(1000, ge=1, le=10_000)):
+    """
+    Retrieve the creates, updates and deletes made after a sequence number.
+    - since: The next value of an earlier response. Without it, returns no changes and the
+      current sequence number to start from (read the full list after taking it).
+    - Returns 410 if the changes after since are no longer kept; re-read the full list
+      and start again without since.
+    """
+    if since is None:
+        latest = students_db.latest_change()
+        return {"latest": latest, "changes": [], "next": latest}
+    changes = students_db.changes_since(since, limit)
+    if changes is None:
+        raise HTTPException(status_code=410, detail="Changes since this sequence number are no longer available.")
+    return {
+        "latest": students_db.latest_change(),
+        "changes": _describe_changes(changes),
+        "next": changes[-1][0] if changes else since,
+    }
+
+# Endpoint to stream the change feed as Server-Sent Events
+@app.get("/students/changes/stream")
+async def stream_changes(request: Request, since: Optional[int] = None):
+    """
+    Stream creates, updates and deletes as Server-Sent Events as they happen.
+    - Each event has the sequence number as its id, the kind of change as its event type
+      and the change feed entry as its data.
+    - since: Start after this sequence number. A reconnecting EventSource sends it as the
+      Last-Event-ID header, which is used when since is not given. Without either, only
+      changes from now on are sent.
+    """
+    if since is None:
+        last_event_id = request.headers.get("last-event-id")
+        since = int(last_event_id) if last_event_id and last_event_id.isdigit() else students_db.latest_change()
+    return StreamingResponse(
+        _stream_changes(request, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# -------------------------
+
+# Endpoint to search students using the store's indexes
+# Declared before /students/{student_id} so "search" is not taken as a student ID
+@app.get("/students/search", response_model=StudentSearchResult)
+def search_students(
+    email: Optional[str] = None,
+    module: Optional[str] = None,
+    lastName: Optional[str] = None,
+    lastNamePrefix: Optional[str] = None,
+    bornFrom: Optional[datetime.date] = None,
+    bornTo: Optional[datetime.date] = None,
+    enrolledFrom: Optional[datetime.date] = None,
+    enrolledTo: Optional[datetime.date] = None,
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """
+    Search students by email, module, last name, date of birth or enrollment date.
+    - Exact matches on email and module use hash indexes.
+    - lastName and lastNamePrefix match case-insensitively using a sorted index.
+    - Date filters are inclusive ranges using sorted indexes.
+    - Returns the total number of matches and up to limit matching students in ID order.
+    """
+    # Log the search request
+    logging.info("Searching students")
+    ids = students_db.search(
+        email=email,
+        module=module,
+        last_name=lastName,
+        last_name_prefix=lastNamePrefix,
+        born_from=bornFrom,
+        born_to=bornTo,
+        enrolled_from=enrolledFrom,
+        enrolled_to=enrolledTo,
+    )
+    page = ids if limit is None else ids[:limit]
+    results = [students_db.get(student_id) for student_id in page]
+    # Return the match count and the matching students (skipping any deleted meanwhile)
+    return {"count": len(ids), "results": [student for student in results if student is not None]}
 
 # -------------------------
 
 # Endpoint to get a specific student by ID
 @app.get("/students/{student_id}", response_model=Student)
-def get_student(student_id: str):
+def get_student(student_id: str, request: Request):
     """
     Retrieve a specific student by their ID.
-    - Returns the student with the matching ID.
+    - Returns the student with the matching ID from the response cache, with an ETag.
+    - Returns 304 if the If-None-Match header matches the student's ETag.
     - If the student ID does not exist, returns a 404 error.
     """
     # Log the request to retrieve a student
-    logging.info(f"Retrieving student with ID {student_id}")
-    if student_id in students_db:
+    logging.info("Retrieving student with ID %s", student_id)
+    cached = response_cache.student(student_id)
+    if cached is not None:
         # Return the student if found
-        return students_db[student_id]
+        return _cached_response(request, cached)
     else:
         # Log an error if the student is not found
-        logging.error(f"Student with ID {student_id} not found.")
+        logging.error("Student with ID %s not found.", student_id)
         # Return a 404 error response
         raise HTTPException(status_code=404, detail="Student not found.")
 
@@ -107,19 +443,24 @@ def update_student(student_id: str, student: Student):
     """
     Update an existing student's information.
     - If the student ID exists, update the student's details.
+    - The student keeps the ID in the path, whatever ID the body has.
     - Returns the updated student information.
     - If the student ID does not exist, returns a 404 error.
     """
     # Log the request to update a student
-    logging.info(f"Updating student with ID {student_id}")
+    logging.info("Updating student with ID %s", student_id)
     if student_id in students_db:
-        # Update the student record
-        students_db[student_id] = student
+        # The path's ID wins, so a listed student's ID is always the key it is stored under
+        student = student.model_copy(update={"id": student_id})
+        # Update the student record and its index entries
+        students_db.replace(student_id, student)
+        # Drop the student's cached response
+        response_cache.invalidate([student_id])
         # Return the updated student
         return student
     else:
         # Log an error if the student is not found
-        logging.error(f"Student with ID {student_id} not found.")
+        logging.error("Student with ID %s not found.", student_id)
         # Return a 404 error response
         raise HTTPException(status_code=404, detail="Student not found.")
 
@@ -135,18 +476,86 @@ def delete_student(student_id: str):
     - If the student ID does not exist, returns a 404 error.
     """
     # Log the request to delete a student
-    logging.info(f"Deleting student with ID {student_id}")
+    logging.info("Deleting student with ID %s", student_id)
     if student_id in students_db:
-        # Remove and return the student if found
-        return students_db.pop(student_id)
+        # Remove the student if found
+        student = students_db.remove(student_id)
+        # Drop the student's cached response
+        response_cache.invalidate([student_id])
+        # Return the deleted student
+        return student
     else:
         # Log an error if the student is not found
-        logging.error(f"Student with ID {student_id} not found.")
+        logging.error("Student with ID %s not found.", student_id)
         # Return a 404 error response
         raise HTTPException(status_code=404, detail="Student not found.")
 
 # -------------------------
 
+# Endpoint to update many students at once
+@app.patch("/students/", response_model=List[StudentBulkResult])
+def patch_students_batch(patches: List[StudentPatch]):
+    """
+    Merge partial updates into many students, all or nothing.
+    - Accepts a list of objects with an id and only the fields to change.
+    - If any ID does not exist or appears twice, nothing is changed and a 400 error
+      lists every conflict with its position in the batch, its ID and the reason.
+    - Fields cannot be set to null, and every merged student must still be a valid
+      Student; otherwise nothing is changed and a 422 error is returned.
+    - Otherwise applies every update at once and returns one result per student.
+    """
+    changes = [(patch.id, patch.model_dump(exclude_unset=True, exclude={"id"})) for patch in patches]
+    try:
+        conflicts, students = students_db.update_many(changes)
+    except ValidationError as error:
+        # A merged student is invalid; nothing has been changed
+        logging.error("Rejected patch of %d students: invalid merged student.", len(patches))
+        raise HTTPException(status_code=422, detail=error.errors(include_url=False, include_context=False))
+    if conflicts:
+        # Log one error for the rejected batch
+        logging.error("Rejected patch of %d students: %d conflicting IDs.", len(patches), len(conflicts))
+        # Return an error response reporting every conflict
+        raise HTTPException(
+            status_code=400,
+            detail=[{"index": index, "id": student_id, "error": reason} for index, student_id, reason in conflicts],
+        )
+    # Drop the cached responses of the changed students
+    response_cache.invalidate(patch.id for patch in patches)
+    # Log one line for the whole batch
+    logging.info("Patched %d students.", len(patches))
+    # Return the updated students
+    return [{"id": patch.id, "status": "updated", "student": student} for patch, student in zip(patches, students)]
+
+# -------------------------
+
+# Endpoint to delete many students at once
+@app.delete("/students/", response_model=List[StudentBulkResult])
+def delete_students_batch(student_ids: List[str] = Body(...)):
+    """
+    Delete many students by ID, all or nothing.
+    - Accepts a JSON list of student IDs.
+    - If any ID does not exist or appears twice, nothing is deleted and a 400 error
+      lists every conflict with its position in the batch, its ID and the reason.
+    - Otherwise deletes every student at once and returns one result per student.
+    """
+    conflicts, students = students_db.remove_many(student_ids)
+    if conflicts:
+        # Log one error for the rejected batch
+        logging.error("Rejected delete of %d students: %d conflicting IDs.", len(student_ids), len(conflicts))
+        # Return an error response reporting every conflict
+        raise HTTPException(
+            status_code=400,
+            detail=[{"index": index, "id": student_id, "error": reason} for index, student_id, reason in conflicts],
+        )
+    # Drop the cached responses of the deleted students
+    response_cache.invalidate(student_ids)
+    # Log one line for the whole batch
+    logging.info("Deleted %d students.", len(student_ids))
+    # Return the deleted students
+    return [{"id": student_id, "status": "deleted", "student": student} for student_id, student in zip(student_ids, students)]
+
+# -------------------------
+
 # Entry point to run the FastAPI application
 if __name__ == "__main__":
     # Uvicorn is an ASGI server for running FastAPI applications
@@ -0,0 +1,102 @@
+from student_models import Student
+from student_store import StudentStore
+import argparse
+import datetime
+import gc
+import json
+import logging
+import random
+import tracemalloc
+
+# -------------------------
+
+# Pools of values used to build synthetic students
+# Real rosters repeat first names, last names and modules heavily, so these pools are small.
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David", "Sarah"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Wilson", "Taylor"]
+MODULES = ["math", "physics", "chemistry", "biology", "history", "computer science", "economics", "art"]
+
+# -------------------------
+
+def make_student(number: int, rng: random.Random) -> dict:
+    """
+    Build the JSON body of one synthetic student.
+    - number: Used for the student ID, email and phone number so they are unique.
+    """
+    return {
+        "id": f"{number:08d}",
+        "firstName": rng.choice(FIRST_NAMES),
+        "middleName": rng.choice(FIRST_NAMES),
+        "lastName": rng.choice(LAST_NAMES),
+        "dateOfBirth": (datetime.date(1995, 1, 1) + datetime.timedelta(days=rng.randrange(3650))).isoformat(),
+        "phoneNumber": f"07{number:09d}",
+        "email": f"student{number}@example.com",
+        "module": rng.choice(MODULES),
+        "enrollmentDate": (datetime.date(2018, 9, 1) + datetime.timedelta(days=365 * rng.randrange(6))).isoformat(),
+    }
+
+def make_students(count: int, seed: int = 0) -> list:
+    """
+    Build the JSON bodies of count synthetic students.
+    """
+    rng = random.Random(seed)
+    return [make_student(number, rng) for number in range(count)]
+
+# -------------------------
+
+def measure(build) -> int:
+    """
+    Return the number of bytes still allocated by the object that build returns.
+    """
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+# -------------------------
+
+def main():
+    """
+    Compare the memory used per student by Pydantic models in a dictionary (the original
+    storage) with the compact StudentRecords kept by StudentStore.
+    """
+    parser = argparse.ArgumentParser(description="Measure bytes per student in the student store.")
+    parser.add_argument("--count", type=int, default=20_000, help="number of synthetic students")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    # Each representation is built from raw JSON, as a request body would be,
+    # so every string it keeps is allocated while it is being measured
+    bodies = [json.dumps(body) for body in make_students(args.count)]
+
+    def models_in_dict():
+        # The original storage: a dictionary of Pydantic models
+        return {model.id: model for model in (Student.model_validate_json(body) for body in bodies)}
+
+    def records_only():
+        store = StudentStore(Student)
+        store.add_many([Student.model_validate_json(body) for body in bodies])
+        return store.records
+
+    def full_store():
+        store = StudentStore(Student)
+        store.add_many([Student.model_validate_json(body) for body in bodies])
+        return store
+
+    print(f"{'representation':<40}{'bytes/student':>15}")
+    for name, build in [
+        ("Pydantic models in a dict", models_in_dict),
+        ("StudentRecords in a dict", records_only),
+        ("StudentStore with all indexes", full_store),
+    ]:
+        print(f"{name:<40}{measure(build) / args.count:>15.1f}")
+
+# -------------------------
+
+# Entry point to run the benchmark
+if __name__ == "__main__":
+    main()
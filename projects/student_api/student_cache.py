@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+import hashlib
+import threading
+
+# -------------------------
+
+def make_etag(body: bytes) -> str:
+    """
+    Return a strong ETag for a response body.
+    """
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag.
+    - Accepts "*" and comma-separated lists; weak validators (W/"...") compare by their tag.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+# -------------------------
+
+class StudentResponseCache:
+    """
+    Cache of encoded JSON response bodies for the student endpoints.
+    - Holds up to max_students encoded students (least recently used are evicted)
+      and the encoded list of every student.
+    - Each cached body is stored with its ETag, so a repeated request costs a dictionary lookup.
+    - Writers call invalidate with the IDs they changed. A generation counter stops a
+      reader that encoded a record before the write from caching the stale bytes after it.
+    - If the store is shared with other processes, every lookup first compares the store's
+      shared version and drops everything when another process has written.
+    """
+
+    def __init__(self, store, max_students: int = 100_000, page_size: int = 1000):
+        self.store = store
+        self.max_students = max_students
+        # Number of students read from the store at a time when encoding the full list
+        self.page_size = page_size
+        self.students: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self.all_students: Optional[Tuple[bytes, str]] = None
+        self.generation = 0
+        self.shared_version = None
+        self.lock = threading.Lock()
+
+    def _check_shared_version(self):
+        """
+        Drop every cached body if the store has been written to by another process.
+        """
+        version = self.store.shared_version()
+        if version is None:
+            return
+        with self.lock:
+            if version != self.shared_version:
+                self.shared_version = version
+                self.generation += 1
+                self.students.clear()
+                self.all_students = None
+
+    def student(self, student_id: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Return the encoded body and ETag of one student, or None if the student does not exist.
+        """
+        self._check_shared_version()
+        with self.lock:
+            cached = self.students.get(student_id)
+            if cached is not None:
+                self.students.move_to_end(student_id)
+                return cached
+            generation = self.generation
+        student = self.store.get(student_id)
+        if student is None:
+            return None
+        body = student.model_dump_json().encode()
+        cached = (body, make_etag(body))
+        with self.lock:
+            if generation == self.generation:
+                self.students[student_id] = cached
+                if len(self.students) > self.max_students:
+                    self.students.popitem(last=False)
+        return cached
+
+    def everyone(self) -> Tuple[bytes, str]:
+        """
+        Return the encoded JSON list of every student, in ID order, and its ETag.
+        - Reuses any encoded students already in the cache.
+        """
+        self._check_shared_version()
+        with self.lock:
+            if self.all_students is not None:
+                return self.all_students
+            generation = self.generation
+            encoded = dict(self.students)
+        parts = []
+        after = None
+        while True:
+            page = self.store.page(after, self.page_size)
+            if not page:
+                break
+            for student_id, student in page:
+                cached = encoded.get(student_id)
+                parts.append(cached[0] if cached is not None else student.model_dump_json().encode())
+            after = page[-1][0]
+        body = b"[" + b",".join(parts) + b"]"
+        cached = (body, make_etag(body))
+        with self.lock:
+            if generation == self.generation:
+                self.all_students = cached
+        return cached
+
+    def invalidate(self, student_ids: Iterable[str]):
+        """
+        Drop the cached bodies of the given students and of the full list.
+        """
+        with self.lock:
+            self.generation += 1
+            self.all_students = None
+            for student_id in student_ids:
+                self.students.pop(student_id, None)
@@ -0,0 +1,101 @@
+from typing import List, Optional, Tuple
+import asyncio
+import threading
+import time
+
+# -------------------------
+
+# Kinds of change recorded in the change log
+CHANGE_CREATE = "create"
+CHANGE_UPDATE = "update"
+CHANGE_DELETE = "delete"
+
+# -------------------------
+
+class ChangeLog:
+    """
+    Bounded, in-order log of the changes made to a store.
+    - Every created, updated or deleted student gets the next sequence number and one
+      (sequence number, kind, student ID) entry.
+    - Only the newest capacity entries are guaranteed to be kept; older ones are trimmed in
+      batches, so a client that falls too far behind has to re-read the full list.
+    - Sequence numbers start at the time the log was created, in microseconds, so they keep
+      increasing across restarts and a cursor from an earlier run is never mistaken for one
+      from this run.
+    - Coroutines can wait for the next change without holding a thread.
+    """
+
+    def __init__(self, capacity: int = 100_000):
+        self.capacity = capacity
+        # Entries in sequence order; sequence numbers are consecutive, so one can be found by offset
+        self.entries: List[Tuple[int, str, str]] = []
+        self.last_seq = time.time_ns() // 1000
+        # (event loop, future) pairs of coroutines waiting for the next change
+        self.waiters = []
+        self.lock = threading.Lock()
+
+    def record(self, kind: str, student_ids: List[str]):
+        """
+        Append one entry per student ID and wake every waiting coroutine.
+        - Called with the store's write lock held, so entries are in the order writes were applied.
+        """
+        if not student_ids:
+            return
+        with self.lock:
+            first = self.last_seq + 1
+            self.entries.extend((first + offset, kind, student_id) for offset, student_id in enumerate(student_ids))
+            self.last_seq = self.entries[-1][0]
+            # Trim in batches, so the cost of shifting the list is spread over many writes
+            if len(self.entries) > self.capacity + self.capacity // 4:
+                del self.entries[:len(self.entries) - self.capacity]
+            waiters, self.waiters = self.waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The waiter's event loop has already closed
+                pass
+
+    def latest(self) -> int:
+        """
+        Return the sequence number of the newest change.
+        """
+        return self.last_seq
+
+    def since(self, since: int, limit: int) -> Optional[List[Tuple[int, str, str]]]:
+        """
+        Return up to limit entries with a sequence number above since, oldest first.
+        - Returns None if since is not a cursor this log can continue from: the entries
+          after it have been trimmed, or it comes from another run.
+        """
+        with self.lock:
+            oldest = self.entries[0][0] if self.entries else self.last_seq + 1
+            if since < oldest - 1 or since > self.last_seq:
+                return None
+            start = since + 1 - oldest
+            return self.entries[start:start + limit]
+
+    async def wait(self, since: int, timeout: float) -> bool:
+        """
+        Wait until there is a change after since, for at most timeout seconds.
+        - Returns whether there is one.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self.lock:
+            if self.last_seq > since:
+                return True
+            self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.lock:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
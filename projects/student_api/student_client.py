@@ -1,17 +1,180 @@
 import requests
+from requests.adapters import HTTPAdapter
+from typing import Iterator, List, Optional, Tuple
+from urllib3.util.retry import Retry
 
 # Define the base URL for the API endpoints
 base_url = "http://127.0.0.1:8000/students/"
 
+# -------------------------
+
+class StudentClient:
+    """
+    Reusable client for the student API.
+    - Keeps one requests Session, so connections are pooled and kept alive between calls.
+    - Applies a (connect, read) timeout to every request.
+    - Retries idempotent calls (GET, PUT, DELETE) on connection errors and 502/503/504
+      responses, with exponential backoff. POST is never retried.
+    - Methods raise requests.HTTPError for error responses and return the decoded JSON.
+    """
+
+    def __init__(
+        self,
+        base_url: str = base_url,
+        timeout: Tuple[float, float] = (3.05, 30.0),
+        retries: int = 3,
+        backoff_factor: float = 0.2,
+        pool_size: int = 10,
+    ):
+        """
+        - base_url: The URL of the /students/ endpoint, ending in a slash.
+        - timeout: Seconds to wait to connect and to wait for a response.
+        - retries: How many times an idempotent call is retried.
+        - backoff_factor: Base delay for retries; the delay doubles on every retry.
+        - pool_size: How many connections are kept open for reuse.
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET", "PUT", "DELETE"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    # Allow the client to be used in a with statement, closing its connections at the end
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Close every pooled connection.
+        """
+        self.session.close()
+
+    def send(self, method: str, path: str = "", **kwargs) -> requests.Response:
+        """
+        Send a request to base_url + path and return the raw response.
+        """
+        return self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+
+    def _json(self, method: str, path: str = "", **kwargs):
+        """
+        Send a request, raise for error responses and return the decoded JSON.
+        """
+        response = self.send(method, path, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    # -------------------------
+
+    def create_students(self, students: List[dict]) -> List[dict]:
+        """
+        Create a batch of students (all or nothing) and return them.
+        """
+        return self._json("POST", json=students)
+
+    def get_all_students(self) -> List[dict]:
+        """
+        Retrieve every student.
+        """
+        return self._json("GET")
+
+    def get_students(self, limit: int, after: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Retrieve one page of students in ID order.
+        - Returns the students and the cursor for the next page (None on the last page).
+        """
+        params = {"limit": limit}
+        if after is not None:
+            params["after"] = after
+        response = self.send("GET", params=params)
+        response.raise_for_status()
+        return response.json(), response.headers.get("X-Next-After")
+
+    def iter_students(self, page_size: int = 1000) -> Iterator[dict]:
+        """
+        Yield every student in ID order, fetching one page at a time.
+        """
+        after = None
+        while True:
+            students, after = self.get_students(page_size, after)
+            yield from students
+            if after is None:
+                return
+
+    def search_students(self, **filters) -> dict:
+        """
+        Search students; filters are the query parameters of GET /students/search.
+        - Returns a dictionary with the match count and the matching students.
+        """
+        return self._json("GET", "search", params=filters)
+
+    def get_changes(self, since: Optional[int] = None, limit: int = 1000) -> dict:
+        """
+        Retrieve the creates, updates and deletes made after a sequence number.
+        - Without since, returns the current sequence number to start syncing from.
+        - Returns a dictionary with the newest sequence number, the changes and the next cursor.
+        - Raises requests.HTTPError with status 410 if since is too old; re-read every student then.
+        """
+        params = {"limit": limit}
+        if since is not None:
+            params["since"] = since
+        return self._json("GET", "changes", params=params)
+
+    def get_student(self, student_id: str) -> dict:
+        """
+        Retrieve a specific student by their ID.
+        """
+        return self._json("GET", student_id)
+
+    def update_student(self, student_id: str, student_data: dict) -> dict:
+        """
+        Replace a student's record and return the updated student.
+        """
+        return self._json("PUT", student_id, json=student_data)
+
+    def delete_student(self, student_id: str) -> dict:
+        """
+        Delete a student by their ID and return the deleted student.
+        """
+        return self._json("DELETE", student_id)
+
+    def patch_students(self, patches: List[dict]) -> List[dict]:
+        """
+        Apply partial updates ({"id": ..., field: value}) to many students (all or nothing).
+        """
+        return self._json("PATCH", json=patches)
+
+    def delete_students(self, student_ids: List[str]) -> List[dict]:
+        """
+        Delete many students by ID (all or nothing).
+        """
+        return self._json("DELETE", json=student_ids)
+
+# -------------------------
+
+# Shared client used by the functions below
+# The functions keep their original behaviour of returning the JSON body even for errors.
+_default_client = StudentClient()
+
 def create_student(student_data):
     """
     Function to create a new student record.
-    - student_data: A dictionary with student details.
+    - student_data: A list of dictionaries with student details.
     - Sends a POST request to the API with the student data.
     - Returns the response from the API as a Python dictionary.
     """
     # Send POST request to create a student
-    response = requests.post(base_url, json=student_data)
+    response = _default_client.send("POST", json=student_data)
     # Convert the API response to JSON and return it
     return response.json()
 
@@ -22,7 +185,7 @@ def get_all_students():
     - Returns the response from the API as a Python dictionary.
     """
     # Send GET request to retrieve all students
-    response = requests.get(base_url)
+    response = _default_client.send("GET")
     # Convert the API response to JSON and return it
     return response.json()
 
@@ -34,7 +197,7 @@ def get_student(student_id):
     - Returns the response from the API as a Python dictionary.
     """
     # Send GET request to retrieve a specific student
-    response = requests.get(f"{base_url}{student_id}")
+    response = _default_client.send("GET", student_id)
     # Convert the API response to JSON and return it
     return response.json()
 
@@ -47,7 +210,7 @@ def update_student(student_id, student_data):
     - Returns the response from the API as a Python dictionary.
     """
     # Send PUT request to update student data
-    response = requests.put(f"{base_url}{student_id}", json=student_data)
+    response = _default_client.send("PUT", student_id, json=student_data)
     # Convert the API response to JSON and return it
     return response.json()
 
@@ -59,55 +222,59 @@ def delete_student(student_id):
     - Returns the response from the API as a Python dictionary.
     """
     # Send DELETE request to delete the student
-    response = requests.delete(f"{base_url}{student_id}")
+    response = _default_client.send("DELETE", student_id)
     # Convert the API response to JSON and return it
     return response.json()
 
-# Example usage of the functions:
-# Define the details of a student to be created
-student_data = {
-    "id": "1", 
-    "firstName": "John",
-    "middleName": "Doe",
-    "lastName": "Smith",
-    # Date of birth in YYYY-MM-DD format
-    "dateOfBirth": "2000-01-01",  
-    "phoneNumber": "1234567890",
-    "email": "john@example.com",
-    "module": "math",
-    "enrollmentDate": "2022-09-01"
-}
-
-# Create a new student
-print("Creating student...")
-# Print the response from the API after creating the student
-print(create_student([student_data]))
-
-# Get and print all student records
-print("Getting all students...")
-# Print the list of all students
-print(get_all_students())
-
-# Get and print the student with ID 1
-print("Getting student with ID 1...")
-# Print the details of the student with ID 1
-print(get_student("1"))
-
-# Update the student details
-print("Updating student...")
-# Make a copy of the student data
-updated_data = student_data.copy()
-# Change the first name to "Jane"
-updated_data["firstName"] = "Jane"
-# Print the response from the API after updating the student
-print(update_student("1", updated_data))
-
-# Delete the student with ID 1
-print("Deleting student...")
-# Print the response from the API after deleting the student
-print(delete_student("1"))
-
-# Get and print all student records after deletion
-print("Getting all students after deletion...")
-# Print the list of all students after deletion to show that the student was removed
-print(get_all_students())
+# -------------------------
+
+# Example usage of the functions
+# Only runs when this file is executed directly, so other code can import the client.
+if __name__ == "__main__":
+    # Define the details of a student to be created
+    student_data = {
+        "id": "1",
+        "firstName": "John",
+        "middleName": "Doe",
+        "lastName": "Smith",
+        # Date of birth in YYYY-MM-DD format
+        "dateOfBirth": "2000-01-01",
+        "phoneNumber": "1234567890",
+        "email": "john@example.com",
+        "module": "math",
+        "enrollmentDate": "2022-09-01"
+    }
+
+    # Create a new student
+    print("Creating student...")
+    # Print the response from the API after creating the student
+    print(create_student([student_data]))
+
+    # Get and print all student records
+    print("Getting all students...")
+    # Print the list of all students
+    print(get_all_students())
+
+    # Get and print the student with ID 1
+    print("Getting student with ID 1...")
+    # Print the details of the student with ID 1
+    print(get_student("1"))
+
+    # Update the student details
+    print("Updating student...")
+    # Make a copy of the student data
+    updated_data = student_data.copy()
+    # Change the first name to "Jane"
+    updated_data["firstName"] = "Jane"
+    # Print the response from the API after updating the student
+    print(update_student("1", updated_data))
+
+    # Delete the student with ID 1
+    print("Deleting student...")
+    # Print the response from the API after deleting the student
+    print(delete_student("1"))
+
+    # Get and print all student records after deletion
+    print("Getting all students after deletion...")
+    # Print the list of all students after deletion to show that the student was removed
+    print(get_all_students())
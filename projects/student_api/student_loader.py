@@ -0,0 +1,322 @@
+from typing import Iterator, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pydantic import ValidationError
+from student_client import StudentClient, base_url
+from student_models import Student
+import argparse
+import csv
+import json
+import os
+import requests
+import threading
+import time
+
+# -------------------------
+
+# Conflict reported by POST /students/ for a student that is already stored.
+# On a resumed or retried load these rows were sent before, so they are counted as skipped.
+ALREADY_EXISTS = "Student ID already exists."
+
+# -------------------------
+
+def read_rows(path: str, file_format: str) -> Iterator[dict]:
+    """
+    Yield the rows of a CSV or NDJSON file one at a time.
+    - CSV files need a header row with the Student field names.
+    - Blank NDJSON lines are ignored; a line that is not a JSON object is yielded as
+      {"_error": message, "_line": text} so it can be rejected like any other bad row.
+    """
+    with open(path, newline="" if file_format == "csv" else None, encoding="utf-8") as source:
+        if file_format == "csv":
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                row = {"_error": f"Invalid JSON: {error}", "_line": line}
+            if not isinstance(row, dict):
+                row = {"_error": "Row is not a JSON object.", "_line": line}
+            yield row
+
+def validate_row(row: dict) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Validate one row against the Student model.
+    - Returns the JSON body to send and None, or None and the reason the row was rejected.
+    """
+    if "_error" in row:
+        return None, row["_error"]
+    try:
+        return Student.model_validate(row).model_dump(mode="json"), None
+    except ValidationError as error:
+        return None, "; ".join(
+            f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+        )
+
+# -------------------------
+
+class Checkpoint:
+    """
+    Records how many rows of the file have been fully handled, so a load can resume.
+    - Chunks can finish out of order; only the end of the longest run of finished
+      chunks from the start of the file is saved.
+    - The file is replaced atomically, so a crash never leaves a half-written checkpoint.
+    """
+
+    def __init__(self, path: str, rows: int = 0):
+        self.path = path
+        self.rows = rows
+        # Row count at the end of each finished chunk, keyed by chunk number
+        self.finished = {}
+        self.next_chunk = 0
+
+    @staticmethod
+    def read(path: str) -> int:
+        """
+        Return the row count saved in a checkpoint file, or 0 if there is none.
+        """
+        try:
+            with open(path) as checkpoint_file:
+                return json.load(checkpoint_file)["rows"]
+        except FileNotFoundError:
+            return 0
+
+    def finish(self, chunk: int, rows_end: int):
+        """
+        Mark a chunk as finished and save the checkpoint if it has moved forward.
+        """
+        self.finished[chunk] = rows_end
+        rows = self.rows
+        while self.next_chunk in self.finished:
+            rows = self.finished.pop(self.next_chunk)
+            self.next_chunk += 1
+        if rows != self.rows:
+            self.rows = rows
+            temporary = self.path + ".tmp"
+            with open(temporary, "w") as checkpoint_file:
+                json.dump({"rows": rows}, checkpoint_file)
+            os.replace(temporary, self.path)
+
+# -------------------------
+
+class StudentLoader:
+    """
+    Streams students from a file into the API in fixed-size chunks.
+    - Rows are read and validated one at a time; rows that fail validation are written to
+      the rejects file with their row number and reason.
+    - At most in_flight chunks are being sent at once. When that many are pending the reader
+      waits for one to finish, so memory use does not grow with the size of the file.
+    - Each chunk is one all-or-nothing POST /students/. If the API reports conflicts, the
+      students that already exist are skipped, the others are rejected, and the rest of the
+      chunk is sent again.
+    - Connection errors, timeouts and 5xx responses are retried with exponential backoff.
+      A chunk the API stored before timing out comes back as conflicts and is skipped.
+    - The rejects file only ever holds one line per rejected row: on resume, lines for rows
+      after the checkpoint are dropped, since those rows are read and checked again.
+    """
+
+    def __init__(
+        self,
+        client: StudentClient,
+        chunk_size: int = 1000,
+        in_flight: int = 4,
+        retries: int = 5,
+        backoff_factor: float = 0.5,
+        rejects_path: Optional[str] = None,
+        progress_interval: float = 5.0,
+    ):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.in_flight = in_flight
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.rejects_path = rejects_path
+        self.progress_interval = progress_interval
+        self.read = 0
+        self.loaded = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+        self.rejects = None
+
+    def _reject(self, row_number: int, row: dict, reason: str):
+        """
+        Count a rejected row and write it to the rejects file.
+        """
+        with self.lock:
+            self.rejected += 1
+            if self.rejects is not None:
+                self.rejects.write(json.dumps({"row": row_number, "error": reason, "data": row}) + "\n")
+
+    def _open_rejects(self, rows: int):
+        """
+        Open the rejects file for appending, keeping only the lines for the first rows rows.
+        - A line that cannot be read (the torn end of an interrupted run) is dropped.
+        - The kept lines are written to a new file that replaces the old one atomically.
+        """
+        kept = []
+        if rows:
+            try:
+                with open(self.rejects_path, encoding="utf-8") as previous:
+                    for line in previous:
+                        try:
+                            if json.loads(line)["row"] <= rows:
+                                kept.append(line)
+                        except (ValueError, KeyError, TypeError):
+                            continue
+            except FileNotFoundError:
+                pass
+        temporary = self.rejects_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as rejects_file:
+            rejects_file.writelines(kept)
+        os.replace(temporary, self.rejects_path)
+        self.rejects = open(self.rejects_path, "a", encoding="utf-8")
+
+    def _post(self, students: List[dict]) -> requests.Response:
+        """
+        POST a chunk, retrying connection errors, timeouts and 5xx responses.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.client.send("POST", json=students)
+                if response.status_code < 500 or attempt == self.retries:
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            time.sleep(self.backoff_factor * (2 ** attempt))
+
+    def _send_chunk(self, rows: List[Tuple[int, dict]]):
+        """
+        Send one chunk of (row number, student) pairs until every student is loaded, skipped or rejected.
+        """
+        while rows:
+            response = self._post([student for _, student in rows])
+            if response.status_code == 200:
+                with self.lock:
+                    self.loaded += len(rows)
+                return
+            detail = response.json().get("detail") if response.status_code == 400 else None
+            if not isinstance(detail, list):
+                response.raise_for_status()
+                raise requests.HTTPError(f"Unexpected response {response.status_code}: {response.text}")
+            # Drop every conflicting student and send the others again
+            conflicts = {conflict["index"]: conflict["error"] for conflict in detail}
+            for index, reason in conflicts.items():
+                row_number, student = rows[index]
+                if reason == ALREADY_EXISTS:
+                    with self.lock:
+                        self.skipped += 1
+                else:
+                    self._reject(row_number, student, reason)
+            rows = [row for index, row in enumerate(rows) if index not in conflicts]
+
+    def _report(self, started: float, done: bool = False):
+        elapsed = time.perf_counter() - started
+        rate = self.read / elapsed if elapsed else 0.0
+        print(f"{'Done' if done else 'Progress'}: {self.read} rows read, {self.loaded} loaded, "
+              f"{self.skipped} skipped, {self.rejected} rejected, {rate:,.0f} rows/s, {elapsed:.1f} s")
+
+    def load(self, rows: Iterator[dict], checkpoint: Checkpoint) -> dict:
+        """
+        Load every row after the checkpoint and return the final counts.
+        """
+        started = last_report = time.perf_counter()
+        pending = {}
+        chunk, chunk_number, row_number = [], 0, 0
+        # Row count at the end of the last chunk handed to the pool
+        submitted = checkpoint.rows
+
+        def settle(return_when):
+            # Wait for pending chunks, re-raising the first failure and advancing the checkpoint
+            finished, _ = wait(pending, return_when=return_when)
+            for future in finished:
+                number, rows_end = pending.pop(future)
+                future.result()
+                # The rejects of every row the checkpoint covers must be on disk first
+                if self.rejects is not None:
+                    with self.lock:
+                        self.rejects.flush()
+                checkpoint.finish(number, rows_end)
+
+        if self.rejects_path:
+            self._open_rejects(checkpoint.rows)
+        try:
+            with ThreadPoolExecutor(self.in_flight) as pool:
+                for row_number, row in enumerate(rows, start=1):
+                    # Skip the rows handled by an earlier run
+                    if row_number <= checkpoint.rows:
+                        continue
+                    self.read += 1
+                    student, reason = validate_row(row)
+                    if reason is not None:
+                        self._reject(row_number, row, reason)
+                    else:
+                        chunk.append((row_number, student))
+                    if len(chunk) < self.chunk_size:
+                        continue
+                    # Backpressure: wait for a slot before sending another chunk
+                    while len(pending) >= self.in_flight:
+                        settle(FIRST_COMPLETED)
+                    pending[pool.submit(self._send_chunk, chunk)] = (chunk_number, row_number)
+                    chunk, chunk_number, submitted = [], chunk_number + 1, row_number
+                    if time.perf_counter() - last_report >= self.progress_interval:
+                        self._report(started)
+                        last_report = time.perf_counter()
+                # The last chunk may be short, or empty if its rows were all rejected
+                if row_number > submitted:
+                    pending[pool.submit(self._send_chunk, chunk)] = (chunk_number, row_number)
+                while pending:
+                    settle(FIRST_COMPLETED)
+        finally:
+            if self.rejects is not None:
+                self.rejects.close()
+                self.rejects = None
+        self._report(started, done=True)
+        return {"read": self.read, "loaded": self.loaded, "skipped": self.skipped, "rejected": self.rejected}
+
+# -------------------------
+
+def main():
+    """
+    Load students from a CSV or NDJSON file into the student API.
+    - The file format is taken from the file extension unless --format is given.
+    - Progress is saved to a checkpoint file; running the same command again resumes after
+      the last fully loaded chunk. Use --restart to ignore the checkpoint.
+    """
+    parser = argparse.ArgumentParser(description="Stream students from a CSV or NDJSON file into the student API.")
+    parser.add_argument("path", help="CSV or NDJSON file of students")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="file format (default: from the extension)")
+    parser.add_argument("--url", default=base_url, help="URL of the /students/ endpoint")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="students per POST request")
+    parser.add_argument("--in-flight", type=int, default=4, help="maximum number of requests in flight")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument("--rejects", help="file for rejected rows (default: <path>.rejects.ndjson)")
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="seconds between progress reports")
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    checkpoint_path = args.checkpoint or args.path + ".checkpoint"
+    start_row = 0 if args.restart else Checkpoint.read(checkpoint_path)
+    if start_row:
+        print(f"Resuming after row {start_row} (from {checkpoint_path}).")
+
+    with StudentClient(args.url, pool_size=args.in_flight) as client:
+        loader = StudentLoader(
+            client,
+            chunk_size=args.chunk_size,
+            in_flight=args.in_flight,
+            rejects_path=args.rejects or args.path + ".rejects.ndjson",
+            progress_interval=args.progress_interval,
+        )
+        loader.load(read_rows(args.path, file_format), Checkpoint(checkpoint_path, start_row))
+
+# -------------------------
+
+# Entry point to run the loader
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+from typing import Dict, List, Optional, Tuple
+from student_changes import CHANGE_CREATE, CHANGE_DELETE, CHANGE_UPDATE
+from student_store import StudentRecord, _HIGH, _ordinal
+import asyncio
+import logging
+import sqlite3
+import threading
+
+# -------------------------
+
+# Largest number of parameters bound in one IN (...) lookup
+_LOOKUP_CHUNK = 500
+
+# Number of changes kept in the changes table
+_CHANGE_CAPACITY = 100_000
+
+# Seconds between checks for new changes while waiting for one
+# Writes may come from other processes, so there is nothing to be notified by.
+_CHANGE_POLL_INTERVAL = 0.2
+
+# Columns stored for each student, in StudentRecord order
+_COLUMNS = StudentRecord.__slots__
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    key TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
+    firstName TEXT NOT NULL,
+    middleName TEXT NOT NULL,
+    lastName TEXT NOT NULL,
+    dateOfBirth INTEGER NOT NULL,
+    phoneNumber TEXT NOT NULL,
+    email TEXT NOT NULL,
+    module TEXT NOT NULL,
+    enrollmentDate INTEGER NOT NULL,
+    emailKey TEXT NOT NULL,
+    lastNameKey TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS students_email ON students (emailKey);
+CREATE INDEX IF NOT EXISTS students_module ON students (module);
+CREATE INDEX IF NOT EXISTS students_last_name ON students (lastNameKey);
+CREATE INDEX IF NOT EXISTS students_date_of_birth ON students (dateOfBirth);
+CREATE INDEX IF NOT EXISTS students_enrollment_date ON students (enrollmentDate);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('version', 0), ('count', 0);
+CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, id TEXT NOT NULL);
+"""
+
+_SELECT = "SELECT key, " + ", ".join(_COLUMNS) + " FROM students"
+_UPSERT = ("INSERT OR REPLACE INTO students (key, " + ", ".join(_COLUMNS) + ", emailKey, lastNameKey) VALUES ("
+           + ", ".join("?" * (len(_COLUMNS) + 3)) + ")")
+
+# -------------------------
+
+class SqliteStudentStore:
+    """
+    Student storage shared by every worker process through one SQLite file.
+    - Offers the same methods as StudentStore, so the endpoints work with either.
+    - Each thread of each process has its own connection; the database runs in WAL mode,
+      so readers never block each other or the writer.
+    - Every write runs in one BEGIN IMMEDIATE transaction that checks and applies the whole
+      batch, so batches stay all or nothing across processes.
+    - Every write bumps a version number in the meta table; response caches compare it to
+      notice writes made by other workers.
+    - Every write adds its changes to a changes table, trimmed to the newest _CHANGE_CAPACITY,
+      so every worker serves the same change feed.
+    """
+
+    def __init__(self, model, path: str, busy_timeout_ms: int = 5000):
+        self.model = model
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    # -------------------------
+
+    # Connections and transactions
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection, opening it on first use.
+        """
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self.local.connection = connection
+        return connection
+
+    def _write(self, apply):
+        """
+        Run apply(connection) in an immediate transaction, record its changes and bump the version.
+        - apply returns a result to pass back, the change in the student count and the
+          (kind, student ID) changes made, or (for a rejected batch) raises _Rejected.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result, count_change, changes = apply(connection)
+            connection.executemany("INSERT INTO changes (kind, id) VALUES (?, ?)", changes)
+            connection.execute("DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?",
+                               (_CHANGE_CAPACITY,))
+            connection.execute("UPDATE meta SET value = value + 1 WHERE name = 'version'")
+            connection.execute("UPDATE meta SET value = value + ? WHERE name = 'count'", (count_change,))
+            connection.execute("COMMIT")
+            return result
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _meta(self, name: str) -> int:
+        return self._connection().execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()[0]
+
+    def load(self):
+        """
+        Nothing to load; every read goes to the database.
+        """
+        logging.info("Using SQLite student store at %s with %d students.", self.path, len(self))
+
+    def close(self):
+        """
+        Close this thread's connection.
+        """
+        connection = getattr(self.local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+    def shared_version(self) -> Optional[int]:
+        """
+        Return a number that changes whenever any process writes to the store.
+        """
+        return self._meta("version")
+
+    # -------------------------
+
+    # Change feed
+
+    def latest_change(self) -> int:
+        """
+        Return the sequence number of the newest change (0 if there has been none).
+        """
+        row = self._connection().execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row[0] if row is not None else 0
+
+    def changes_since(self, since: int, limit: int) -> Optional[List[Tuple[int, str, str]]]:
+        """
+        Return up to limit (sequence number, kind, student ID) changes after since, oldest first.
+        - Returns None if the changes after since are no longer kept.
+        """
+        connection = self._connection()
+        # Read the bounds and the changes in one snapshot
+        connection.execute("BEGIN")
+        try:
+            latest = self.latest_change()
+            oldest = connection.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            if since > latest or since < (oldest if oldest is not None else latest + 1) - 1:
+                return None
+            return connection.execute(
+                "SELECT seq, kind, id FROM changes WHERE seq > ? ORDER BY seq LIMIT ?", (since, limit)
+            ).fetchall()
+        finally:
+            connection.execute("COMMIT")
+
+    async def wait_for_change(self, since: int, timeout: float) -> bool:
+        """
+        Wait up to timeout seconds for a change after since and return whether there is one.
+        - Polls the database, since the change may be written by another process.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.latest_change() <= since:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(_CHANGE_POLL_INTERVAL, remaining))
+        return True
+
+    # -------------------------
+
+    # Read access in the style of a dictionary
+
+    def __contains__(self, student_id: str) -> bool:
+        return self._connection().execute("SELECT 1 FROM students WHERE key = ?", (student_id,)).fetchone() is not None
+
+    def __getitem__(self, student_id: str):
+        student = self.get(student_id)
+        if student is None:
+            raise KeyError(student_id)
+        return student
+
+    def __len__(self) -> int:
+        return self._meta("count")
+
+    def get(self, student_id: str, default=None):
+        row = self._connection().execute(_SELECT + " WHERE key = ?", (student_id,)).fetchone()
+        return self._student(row) if row is not None else default
+
+    def values(self):
+        after = None
+        while True:
+            page = self.page(after, 1000)
+            if not page:
+                return
+            for _, student in page:
+                yield student
+            after = page[-1][0]
+
+    def _student(self, row):
+        return StudentRecord(*row[1:]).to_student(self.model)
+
+    # -------------------------
+
+    # Writes
+
+    def add(self, student):
+        """
+        Add a new student (raises KeyError if the ID exists).
+        """
+        if self.add_many([student]):
+            raise KeyError(student.id)
+
+    def add_many(self, students: List) -> List[Tuple[int, str, str]]:
+        """
+        Add a batch of new students, all or nothing (see StudentStore.add_many).
+        """
+        def apply(connection):
+            existing = self._existing(connection, [student.id for student in students])
+            conflicts = []
+            seen = set()
+            for position, student in enumerate(students):
+                if student.id in existing:
+                    conflicts.append((position, student.id, "Student ID already exists."))
+                elif student.id in seen:
+                    conflicts.append((position, student.id, "Student ID is repeated in the batch."))
+                seen.add(student.id)
+            if conflicts:
+                raise _Rejected(conflicts)
+            connection.executemany(_UPSERT, [_row(student.id, student) for student in students])
+            return [], len(students), [(CHANGE_CREATE, student.id) for student in students]
+        return self._rejectable(apply)
+
+    def replace(self, student_id: str, student):
+        """
+        Replace the student stored under student_id (raises KeyError if it does not exist).
+        """
+        conflicts, _ = self.update_many([(student_id, dict(student))])
+        if conflicts:
+            raise KeyError(student_id)
+
+    def remove(self, student_id: str):
+        """
+        Remove and return the student stored under student_id (raises KeyError if it does not exist).
+        """
+        conflicts, students = self.remove_many([student_id])
+        if conflicts:
+            raise KeyError(student_id)
+        return students[0]
+
+    def update_many(self, changes: List[Tuple[str, dict]]) -> Tuple[List[Tuple[int, str, str]], List]:
+        """
+        Merge partial updates into existing students, all or nothing (see StudentStore.update_many).
+        """
+        def apply(connection):
+            current = self._fetch(connection, [student_id for student_id, _ in changes])
+            _check_existing([student_id for student_id, _ in changes], current)
+            # Validate every merged student before writing any; a ValidationError rolls back
+            students = [self.model.model_validate({**current[student_id].model_dump(), **fields})
+                        for student_id, fields in changes]
+            connection.executemany(_UPSERT, [_row(student_id, student)
+                                             for (student_id, _), student in zip(changes, students)])
+            return ([], students), 0, [(CHANGE_UPDATE, student_id) for student_id, _ in changes]
+        return self._rejectable(apply, pair=True)
+
+    def remove_many(self, student_ids: List[str]) -> Tuple[List[Tuple[int, str, str]], List]:
+        """
+        Remove many students, all or nothing (see StudentStore.remove_many).
+        """
+        def apply(connection):
+            current = self._fetch(connection, student_ids)
+            _check_existing(student_ids, current)
+            connection.executemany("DELETE FROM students WHERE key = ?", [(student_id,) for student_id in student_ids])
+            return (([], [current[student_id] for student_id in student_ids]), -len(student_ids),
+                    [(CHANGE_DELETE, student_id) for student_id in student_ids])
+        return self._rejectable(apply, pair=True)
+
+    def _rejectable(self, apply, pair: bool = False):
+        """
+        Run a write, turning a rejected batch into its list of conflicts.
+        """
+        try:
+            return self._write(apply)
+        except _Rejected as rejected:
+            return (rejected.conflicts, []) if pair else rejected.conflicts
+
+    def _existing(self, connection, student_ids: List[str]) -> set:
+        """
+        Return which of the given IDs are stored.
+        """
+        existing = set()
+        for start in range(0, len(student_ids), _LOOKUP_CHUNK):
+            chunk = student_ids[start:start + _LOOKUP_CHUNK]
+            query = "SELECT key FROM students WHERE key IN (" + ", ".join("?" * len(chunk)) + ")"
+            existing.update(row[0] for row in connection.execute(query, chunk))
+        return existing
+
+    def _fetch(self, connection, student_ids: List[str]) -> Dict:
+        """
+        Return the stored students with the given IDs, keyed by ID.
+        """
+        students = {}
+        for start in range(0, len(student_ids), _LOOKUP_CHUNK):
+            chunk = student_ids[start:start + _LOOKUP_CHUNK]
+            query = _SELECT + " WHERE key IN (" + ", ".join("?" * len(chunk)) + ")"
+            students.update((row[0], self._student(row)) for row in connection.execute(query, chunk))
+        return students
+
+    # -------------------------
+
+    # Queries
+
+    def page_ids(self, after: Optional[str], limit: Optional[int]) -> List[str]:
+        """
+        Return the IDs of one page of students in ID order (see StudentStore.page_ids).
+        """
+        rows = self._connection().execute(
+            "SELECT key FROM students WHERE key > ? ORDER BY key LIMIT ?",
+            (after if after is not None else "", limit if limit is not None else -1),
+        )
+        return [row[0] for row in rows]
+
+    def page(self, after: Optional[str], limit: Optional[int]) -> List[Tuple[str, object]]:
+        """
+        Return one page of (student ID, student) pairs in ID order.
+        """
+        rows = self._connection().execute(
+            _SELECT + " WHERE key > ? ORDER BY key LIMIT ?",
+            (after if after is not None else "", limit if limit is not None else -1),
+        )
+        return [(row[0], self._student(row)) for row in rows]
+
+    def last_id(self) -> Optional[str]:
+        return self._connection().execute("SELECT MAX(key) FROM students").fetchone()[0]
+
+    def search(
+        self,
+        email: Optional[str] = None,
+        module: Optional[str] = None,
+        last_name: Optional[str] = None,
+        last_name_prefix: Optional[str] = None,
+        born_from=None,
+        born_to=None,
+        enrolled_from=None,
+        enrolled_to=None,
+    ) -> List[str]:
+        """
+        Return the sorted IDs of students matching every given filter (see StudentStore.search).
+        - SQLite picks the most selective index for the query.
+        """
+        conditions, parameters = [], []
+        for condition, value in [
+            ("emailKey = ?", email.lower() if email is not None else None),
+            ("module = ?", module),
+            ("lastNameKey = ?", last_name.casefold() if last_name is not None else None),
+            ("lastNameKey >= ?", last_name_prefix.casefold() if last_name_prefix is not None else None),
+            ("lastNameKey < ?", last_name_prefix.casefold() + _HIGH if last_name_prefix is not None else None),
+            ("dateOfBirth >= ?", _ordinal(born_from)),
+            ("dateOfBirth <= ?", _ordinal(born_to)),
+            ("enrollmentDate >= ?", _ordinal(enrolled_from)),
+            ("enrollmentDate <= ?", _ordinal(enrolled_to)),
+        ]:
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        query = "SELECT key FROM students"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return [row[0] for row in self._connection().execute(query + " ORDER BY key", parameters)]
+
+# -------------------------
+
+class _Rejected(Exception):
+    """
+    Raised inside a write transaction to roll back a batch with conflicts.
+    """
+
+    def __init__(self, conflicts: List[Tuple[int, str, str]]):
+        super().__init__(conflicts)
+        self.conflicts = conflicts
+
+def _check_existing(student_ids: List[str], current: Dict):
+    """
+    Raise _Rejected listing every ID that is missing from current or repeated.
+    """
+    conflicts = []
+    seen = set()
+    for position, student_id in enumerate(student_ids):
+        if student_id not in current:
+            conflicts.append((position, student_id, "Student not found."))
+        elif student_id in seen:
+            conflicts.append((position, student_id, "Student ID is repeated in the batch."))
+        seen.add(student_id)
+    if conflicts:
+        raise _Rejected(conflicts)
+
+def _row(student_id: str, student) -> tuple:
+    """
+    Return the column values stored for a student under student_id.
+    """
+    record = StudentRecord.from_student(student)
+    return (student_id,) + record.astuple() + (record.email.lower(), record.lastName.casefold())
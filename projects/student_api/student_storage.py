@@ -0,0 +1,386 @@
+from typing import Iterator, List, Optional, Tuple
+import json
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+# -------------------------
+
+# Header written before every write-ahead log entry: payload length and CRC32 of the payload
+_ENTRY_HEADER = struct.Struct("<II")
+
+# File names used inside the data directory
+_SNAPSHOT_FILE = "snapshot.bin"
+_SEGMENT_PREFIX = "wal-"
+_SEGMENT_SUFFIX = ".log"
+
+# -------------------------
+
+class MemoryEngine:
+    """
+    Storage engine that keeps nothing on disk.
+    - Used by default; the student store then lives only in memory, as before.
+    - persists is False, so the store does not encode operations for it at all.
+    """
+
+    persists = False
+
+    def load(self) -> Tuple[List[str], Iterator[tuple], Iterator[list]]:
+        """
+        Return the stored state: snapshot field names, snapshot rows and logged operations.
+        """
+        return [], iter(()), iter(())
+
+    def start(self):
+        """
+        Get ready to accept writes once the stored state has been loaded.
+        """
+
+    def append(self, operations: List[str]) -> int:
+        """
+        Record a group of operations and return a ticket to wait on.
+        """
+        return 0
+
+    def wait(self, ticket: int):
+        """
+        Block until the operations behind ticket are durable.
+        """
+
+    def needs_snapshot(self) -> bool:
+        """
+        Check whether enough has been logged since the last snapshot to compact.
+        """
+        return False
+
+    def start_snapshot(self, records: List[tuple]):
+        """
+        Begin writing a snapshot of the given (key, record) pairs.
+        """
+
+    def close(self):
+        """
+        Flush anything pending and release files.
+        """
+
+# -------------------------
+
+class LogEngine:
+    """
+    Durable storage engine built on a write-ahead log and periodic snapshots.
+    - Every store mutation is appended to the current log segment as one checksummed entry,
+      so a batch is either fully replayed or not at all.
+    - A background thread fsyncs the log every commit_interval seconds; writers wait for
+      the fsync covering their entry, so concurrent writers share one fsync (group commit).
+    - Once snapshot_bytes of log have been written, the log is rotated to a new segment and
+      the store contents are written to a binary snapshot in the background. Segments
+      covered by the snapshot are then deleted.
+    - On startup the snapshot is loaded and only the segments written after it are replayed.
+    - If writing or fsyncing the log fails, the error is kept and raised to every writer
+      from then on: after a failed fsync it is unknown what reached the disk, so nothing
+      later is acknowledged as durable.
+    """
+
+    persists = True
+
+    def __init__(self, directory: str, commit_interval: float = 0.002, snapshot_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.snapshot_bytes = snapshot_bytes
+        os.makedirs(directory, exist_ok=True)
+        # Condition guarding the log file and the written/durable counters
+        self.condition = threading.Condition()
+        # Lock held while fsyncing, so the segment cannot be rotated or closed under an fsync
+        self.sync_lock = threading.Lock()
+        self.file = None
+        self.segment = 0
+        self.written = 0
+        self.durable = 0
+        self.bytes_since_snapshot = 0
+        self.closed = False
+        self.flusher: Optional[threading.Thread] = None
+        self.snapshotter: Optional[threading.Thread] = None
+        self.snapshot_segment = -1
+        # First error from writing or fsyncing the log; once set, no write can become durable
+        self.error: Optional[OSError] = None
+
+    # -------------------------
+
+    # Loading
+
+    def load(self) -> Tuple[List[str], Iterator[tuple], Iterator[list]]:
+        """
+        Read the snapshot and the log tail.
+        - Returns the snapshot field names, the snapshot rows (key followed by field values)
+          and an iterator of logged operations in the order they were applied.
+        - A torn entry at the end of a segment (from a crash mid-write) is truncated.
+        """
+        fields, rows = [], []
+        snapshot_path = os.path.join(self.directory, _SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "rb") as snapshot_file:
+                snapshot = pickle.load(snapshot_file)
+            fields, rows, self.snapshot_segment = snapshot["fields"], snapshot["rows"], snapshot["segment"]
+
+        segments = [segment for segment in self._segments() if segment > self.snapshot_segment]
+        logging.info("Loading %d snapshot rows and %d log segments.", len(rows), len(segments))
+        return fields, iter(rows), self._replay(segments)
+
+    def start(self):
+        """
+        Open the newest segment for appending and start the group commit thread.
+        - Must be called after the operations returned by load have been replayed.
+        """
+        segments = [segment for segment in self._segments() if segment > self.snapshot_segment]
+        self.segment = segments[-1] if segments else self.snapshot_segment + 1
+        self._open_segment()
+        self.flusher = threading.Thread(target=self._flush_loop, name="student-wal-flusher", daemon=True)
+        self.flusher.start()
+
+    def _replay(self, segments: List[int]) -> Iterator[list]:
+        """
+        Yield the operations logged in the given segments, oldest first.
+        """
+        for segment in segments:
+            path = self._segment_path(segment)
+            with open(path, "r+b") as segment_file:
+                offset = 0
+                while True:
+                    header = segment_file.read(_ENTRY_HEADER.size)
+                    if len(header) < _ENTRY_HEADER.size:
+                        break
+                    length, checksum = _ENTRY_HEADER.unpack(header)
+                    payload = segment_file.read(length)
+                    if len(payload) < length or zlib.crc32(payload) != checksum:
+                        break
+                    offset = segment_file.tell()
+                    for operation in json.loads(payload):
+                        yield operation
+                # Drop anything after the last complete entry
+                if offset < os.path.getsize(path):
+                    logging.warning("Truncating torn entry at offset %d of %s.", offset, path)
+                    segment_file.truncate(offset)
+
+    # -------------------------
+
+    # Writing
+
+    def append(self, operations: List[str]) -> int:
+        """
+        Append one log entry holding the given JSON-encoded operations.
+        - Returns a ticket to pass to wait once the caller has released its own locks.
+        """
+        payload = ("[" + ",".join(operations) + "]").encode()
+        with self.condition:
+            self._raise_error()
+            try:
+                self.file.write(_ENTRY_HEADER.pack(len(payload), zlib.crc32(payload)))
+                self.file.write(payload)
+            except OSError as error:
+                self._fail(error)
+                raise
+            self.written += 1
+            self.bytes_since_snapshot += _ENTRY_HEADER.size + len(payload)
+            self.condition.notify_all()
+            return self.written
+
+    def wait(self, ticket: int):
+        """
+        Block until the entry behind ticket has been fsynced.
+        - Raises OSError if the log failed before the entry was fsynced.
+        """
+        with self.condition:
+            while self.durable < ticket and not self.closed and self.error is None:
+                self.condition.wait()
+            if self.durable < ticket:
+                self._raise_error()
+
+    def _flush_loop(self):
+        """
+        Fsync the log every commit_interval seconds while there are unsynced entries.
+        - Appends keep going into the file buffer while an fsync is in progress.
+        - Stops on the first write or fsync error, after handing it to the waiting writers.
+        """
+        while True:
+            with self.condition:
+                while self.written == self.durable and not self.closed and self.error is None:
+                    self.condition.wait()
+                if self.closed or self.error is not None:
+                    return
+            with self.sync_lock:
+                try:
+                    with self.condition:
+                        if self.closed:
+                            return
+                        target = self.written
+                        self.file.flush()
+                    os.fsync(self.file.fileno())
+                except OSError as error:
+                    logging.exception("Failed to sync the student write-ahead log; no further writes will be accepted.")
+                    with self.condition:
+                        self._fail(error)
+                    return
+            with self.condition:
+                self.durable = max(self.durable, target)
+                self.condition.notify_all()
+            time.sleep(self.commit_interval)
+
+    # -------------------------
+
+    # Snapshots
+
+    def needs_snapshot(self) -> bool:
+        """
+        Check whether enough has been logged since the last snapshot to compact.
+        """
+        return self.bytes_since_snapshot >= self.snapshot_bytes and self.snapshotter is None
+
+    def start_snapshot(self, records: List[tuple]):
+        """
+        Rotate the log and write a snapshot of records in the background.
+        - Must be called with the store's write lock held, so records matches every
+          entry in the segments being closed.
+        """
+        with self.sync_lock, self.condition:
+            covered_segment = self.segment
+            self._sync_locked()
+            self.file.close()
+            self.segment += 1
+            self._open_segment()
+            self.bytes_since_snapshot = 0
+        self.snapshotter = threading.Thread(
+            target=self._write_snapshot, args=(records, covered_segment), name="student-snapshot", daemon=True
+        )
+        self.snapshotter.start()
+
+    def _write_snapshot(self, records: List[tuple], covered_segment: int):
+        """
+        Write records to a new snapshot file, then delete the segments it covers.
+        """
+        try:
+            fields = list(type(records[0][1]).__slots__) if records else []
+            rows = [(key,) + record.astuple() for key, record in records]
+            snapshot_path = os.path.join(self.directory, _SNAPSHOT_FILE)
+            temporary_path = snapshot_path + ".tmp"
+            with open(temporary_path, "wb") as snapshot_file:
+                pickle.dump({"segment": covered_segment, "fields": fields, "rows": rows}, snapshot_file,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.replace(temporary_path, snapshot_path)
+            self._sync_directory()
+            for segment in self._segments():
+                if segment <= covered_segment:
+                    os.remove(self._segment_path(segment))
+            logging.info("Wrote snapshot of %d students covering log segment %d.", len(rows), covered_segment)
+        except OSError:
+            logging.exception("Failed to write student snapshot.")
+        finally:
+            self.snapshotter = None
+
+    # -------------------------
+
+    # Shutdown
+
+    def close(self):
+        """
+        Wait for any snapshot in progress, fsync the log and close it.
+        """
+        snapshotter = self.snapshotter
+        if snapshotter is not None:
+            snapshotter.join()
+        with self.sync_lock, self.condition:
+            if self.file is not None and not self.file.closed:
+                if self.error is None:
+                    self._sync_locked()
+                self.file.close()
+            self.closed = True
+            self.condition.notify_all()
+
+    # -------------------------
+
+    # Files
+
+    def _sync_locked(self):
+        """
+        Flush and fsync the current segment (condition must be held).
+        """
+        try:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except OSError as error:
+            self._fail(error)
+            raise
+        self.durable = self.written
+        self.condition.notify_all()
+
+    def _fail(self, error: OSError):
+        """
+        Record the first log error and wake every writer waiting on it (condition must be held).
+        """
+        if self.error is None:
+            self.error = error
+        self.condition.notify_all()
+
+    def _raise_error(self):
+        """
+        Raise the recorded log error, if any (condition must be held).
+        """
+        if self.error is not None:
+            raise OSError(f"Student write-ahead log failed: {self.error}") from self.error
+
+    def _open_segment(self):
+        """
+        Open the current segment for appending.
+        """
+        self.file = open(self._segment_path(self.segment), "ab")
+        self._sync_directory()
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{_SEGMENT_PREFIX}{segment:08d}{_SEGMENT_SUFFIX}")
+
+    def _segments(self) -> List[int]:
+        """
+        Return the numbers of the segments in the data directory, in order.
+        """
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX):
+                segments.append(int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]))
+        return sorted(segments)
+
+    def _sync_directory(self):
+        """
+        Fsync the data directory so file creations and renames are durable.
+        """
+        if hasattr(os, "O_DIRECTORY"):
+            descriptor = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+
+# -------------------------
+
+def open_engine():
+    """
+    Create the storage engine selected by environment variables.
+    - STUDENT_STORAGE: "memory" (default) or "log".
+    - STUDENT_DATA_DIR: directory for the log and snapshot (default ./student_data).
+    - STUDENT_COMMIT_INTERVAL_MS: group commit interval in milliseconds (default 2).
+    - STUDENT_SNAPSHOT_MB: log size in megabytes that triggers a snapshot (default 64).
+    """
+    storage = os.environ.get("STUDENT_STORAGE", "memory")
+    if storage == "memory":
+        return MemoryEngine()
+    if storage == "log":
+        return LogEngine(
+            os.environ.get("STUDENT_DATA_DIR", "./student_data"),
+            commit_interval=float(os.environ.get("STUDENT_COMMIT_INTERVAL_MS", "2")) / 1000,
+            snapshot_bytes=int(float(os.environ.get("STUDENT_SNAPSHOT_MB", "64")) * 1024 * 1024),
+        )
+    raise ValueError(f"Unknown STUDENT_STORAGE {storage!r}; expected 'memory' or 'log'.")
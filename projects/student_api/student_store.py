@@ -0,0 +1,663 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from student_changes import CHANGE_CREATE, CHANGE_DELETE, CHANGE_UPDATE, ChangeLog
+from student_storage import MemoryEngine
+import bisect
+import datetime
+import json
+import sys
+import threading
+
+# -------------------------
+
+# Batches larger than this are merged into (or removed from) a sorted list
+# in one pass instead of one binary search per entry.
+_BULK_SORT_THRESHOLD = 64
+
+# Highest possible code point
+# Used as an upper sentinel so range and prefix lookups can bisect on (key, id) tuples.
+_HIGH = "\U0010ffff"
+
+# Shared int objects for date ordinals
+# Records holding the same date then point at one int instead of one each.
+_ordinals: Dict[int, int] = {}
+
+# -------------------------
+
+class StudentRecord:
+    """
+    Compact internal representation of a student.
+    - Uses __slots__ instead of a per-instance __dict__.
+    - Names and modules are interned, so repeated values share one string.
+    - Dates are stored as shared proleptic Gregorian ordinals.
+    - Converted to the API model only when a student leaves the store.
+    """
+
+    __slots__ = ("id", "firstName", "middleName", "lastName", "dateOfBirth",
+                 "phoneNumber", "email", "module", "enrollmentDate")
+
+    def __init__(self, id, firstName, middleName, lastName, dateOfBirth, phoneNumber, email, module, enrollmentDate):
+        self.id = id
+        self.firstName = sys.intern(firstName)
+        self.middleName = sys.intern(middleName)
+        self.lastName = sys.intern(lastName)
+        self.dateOfBirth = _ordinal(dateOfBirth)
+        self.phoneNumber = phoneNumber
+        self.email = email
+        self.module = sys.intern(module)
+        self.enrollmentDate = _ordinal(enrollmentDate)
+
+    @classmethod
+    def from_student(cls, student) -> "StudentRecord":
+        """
+        Build a record from a validated Student model.
+        """
+        return cls(student.id, student.firstName, student.middleName, student.lastName, student.dateOfBirth,
+                   student.phoneNumber, student.email, student.module, student.enrollmentDate)
+
+    def to_student(self, model):
+        """
+        Build the API model for this record without re-validating it.
+        """
+        return model.model_construct(
+            id=self.id,
+            firstName=self.firstName,
+            middleName=self.middleName,
+            lastName=self.lastName,
+            dateOfBirth=datetime.date.fromordinal(self.dateOfBirth),
+            phoneNumber=self.phoneNumber,
+            email=self.email,
+            module=self.module,
+            enrollmentDate=datetime.date.fromordinal(self.enrollmentDate),
+        )
+
+    def astuple(self) -> tuple:
+        """
+        Return the field values in __slots__ order.
+        """
+        return (self.id, self.firstName, self.middleName, self.lastName, self.dateOfBirth,
+                self.phoneNumber, self.email, self.module, self.enrollmentDate)
+
+# -------------------------
+
+class SortedIndex:
+    """
+    A sorted index of (key, student ID) pairs.
+    - Supports inclusive range and prefix lookups with binary search.
+    - Counting the matches of a lookup does not copy any entries.
+    """
+
+    def __init__(self):
+        self.entries: List[Tuple] = []
+
+    def add(self, key, student_id: str):
+        """
+        Add an entry for the student.
+        """
+        bisect.insort(self.entries, (key, student_id))
+
+    def add_many(self, pairs: List[Tuple]):
+        """
+        Add many (key, student ID) entries at once.
+        """
+        _merge_sorted(self.entries, pairs)
+
+    def remove_many(self, pairs: List[Tuple]):
+        """
+        Remove many (key, student ID) entries at once.
+        """
+        _remove_sorted(self.entries, pairs)
+
+    def remove(self, key, student_id: str):
+        """
+        Remove the entry for the student, if present.
+        """
+        position = bisect.bisect_left(self.entries, (key, student_id))
+        if position < len(self.entries) and self.entries[position] == (key, student_id):
+            del self.entries[position]
+
+    def range_bounds(self, low=None, high=None) -> Tuple[int, int]:
+        """
+        Return the slice of entries whose key is between low and high (both inclusive).
+        - A missing bound leaves that side of the range open.
+        """
+        start = bisect.bisect_left(self.entries, (low,)) if low is not None else 0
+        end = bisect.bisect_right(self.entries, (high, _HIGH)) if high is not None else len(self.entries)
+        return start, max(start, end)
+
+    def prefix_bounds(self, prefix: str) -> Tuple[int, int]:
+        """
+        Return the slice of entries whose key starts with prefix.
+        """
+        start = bisect.bisect_left(self.entries, (prefix,))
+        end = bisect.bisect_left(self.entries, (prefix + _HIGH,))
+        return start, end
+
+    def ids(self, bounds: Tuple[int, int]) -> Iterable[str]:
+        """
+        Yield the student IDs in a slice returned by range_bounds or prefix_bounds.
+        """
+        start, end = bounds
+        for position in range(start, end):
+            yield self.entries[position][1]
+
+# -------------------------
+
+class StudentStore:
+    """
+    In-memory student storage with secondary indexes.
+    - Records are stored as compact StudentRecords in a dictionary keyed by student ID,
+      and converted to model (the API's Student class) on the way out.
+    - A sorted list of IDs supports keyset pagination.
+    - Hash indexes on email and module answer exact lookups.
+    - Sorted indexes on last name, date of birth and enrollment date answer range and prefix lookups.
+    - Every index is updated on add, replace and remove.
+    - Every write is passed to a storage engine (see student_storage) before it returns.
+    - Every write is recorded in a bounded change log (see student_changes) for change feeds.
+    """
+
+    def __init__(self, model, engine=None):
+        # Model class returned by reads
+        self.model = model
+        # Storage engine that persists writes; defaults to keeping nothing on disk
+        self.engine = engine if engine is not None else MemoryEngine()
+        self.records: Dict = {}
+        self.ids: List[str] = []
+        # Hash index buckets hold a single ID, or a set once a key has several IDs
+        self.by_email: Dict[str, Union[str, Set[str]]] = {}
+        self.by_module: Dict[str, Union[str, Set[str]]] = {}
+        self.by_last_name = SortedIndex()
+        self.by_date_of_birth = SortedIndex()
+        self.by_enrollment_date = SortedIndex()
+        # Sequence-numbered log of recent creates, updates and deletes
+        self.changes = ChangeLog()
+        # Lock held while a write updates the records and the indexes together
+        self.lock = threading.RLock()
+
+    # -------------------------
+
+    # Loading
+
+    def load(self):
+        """
+        Load the engine's stored state into the store.
+        - Snapshot rows are trusted and built without validation.
+        - Logged operations are validated against the model and replayed in order.
+        - The indexes are rebuilt once at the end, then the engine starts accepting writes.
+        """
+        with self.lock:
+            fields, rows, operations = self.engine.load()
+            for row in rows:
+                self.records[row[0]] = StudentRecord(**dict(zip(fields, row[1:])))
+            for operation in operations:
+                if operation[0] == "put":
+                    self.records[operation[1]] = StudentRecord.from_student(self.model.model_validate(operation[2]))
+                else:
+                    self.records.pop(operation[1], None)
+            self._rebuild_indexes()
+            self.engine.start()
+
+    def _rebuild_indexes(self):
+        """
+        Rebuild the ID list and every secondary index from the records.
+        """
+        self.ids = sorted(self.records)
+        self.by_email, self.by_module = {}, {}
+        for student_id, record in self.records.items():
+            _bucket_add(self.by_email, _email_key(record), student_id)
+            _bucket_add(self.by_module, record.module, student_id)
+        items = self.records.items()
+        self.by_last_name.entries = sorted((_name_key(record), key) for key, record in items)
+        self.by_date_of_birth.entries = sorted((record.dateOfBirth, key) for key, record in items)
+        self.by_enrollment_date.entries = sorted((record.enrollmentDate, key) for key, record in items)
+
+    def _log(self, puts: Iterable[Tuple[str, Any]] = (), deletes: Iterable[str] = ()) -> int:
+        """
+        Encode a write and pass it to the engine (write lock must be held).
+        - puts: (student ID, student) pairs stored; deletes: student IDs removed.
+        - Nothing is encoded when the engine does not persist, so the in-memory store does
+          not pay for JSON it would throw away.
+        - Starts a snapshot when the engine asks for one, while the records match the log.
+        - Returns the ticket to wait on once the write lock is released.
+        """
+        if not self.engine.persists:
+            return 0
+        operations = [_put_operation(student_id, student) for student_id, student in puts]
+        operations += [_delete_operation(student_id) for student_id in deletes]
+        ticket = self.engine.append(operations)
+        if self.engine.needs_snapshot():
+            self.engine.start_snapshot(list(self.records.items()))
+        return ticket
+
+    def close(self):
+        """
+        Flush and close the storage engine.
+        """
+        self.engine.close()
+
+    def shared_version(self) -> Optional[int]:
+        """
+        Return a number that changes when another process writes to the store.
+        - This store is private to its process, so there is none.
+        """
+        return None
+
+    # -------------------------
+
+    # Change feed
+
+    def latest_change(self) -> int:
+        """
+        Return the sequence number of the newest change.
+        """
+        return self.changes.latest()
+
+    def changes_since(self, since: int, limit: int) -> Optional[List[Tuple[int, str, str]]]:
+        """
+        Return up to limit (sequence number, kind, student ID) changes after since, oldest first.
+        - Returns None if the changes after since are no longer kept.
+        """
+        return self.changes.since(since, limit)
+
+    async def wait_for_change(self, since: int, timeout: float) -> bool:
+        """
+        Wait up to timeout seconds for a change after since and return whether there is one.
+        """
+        return await self.changes.wait(since, timeout)
+
+    # -------------------------
+
+    # Read access in the style of a dictionary
+
+    def __contains__(self, student_id: str) -> bool:
+        return student_id in self.records
+
+    def __getitem__(self, student_id: str):
+        return self.records[student_id].to_student(self.model)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, student_id: str, default=None):
+        record = self.records.get(student_id)
+        return record.to_student(self.model) if record is not None else default
+
+    def values(self):
+        return (record.to_student(self.model) for record in list(self.records.values()))
+
+    # -------------------------
+
+    # Writes
+
+    def add(self, student):
+        """
+        Add a new student and index it under its own ID.
+        """
+        with self.lock:
+            record = StudentRecord.from_student(student)
+            self.records[student.id] = record
+            bisect.insort(self.ids, student.id)
+            self._index(student.id, record)
+            self.changes.record(CHANGE_CREATE, [student.id])
+            ticket = self._log(puts=[(student.id, student)])
+        self.engine.wait(ticket)
+
+    def add_many(self, students: List) -> List[Tuple[int, str, str]]:
+        """
+        Add a batch of new students, all or nothing.
+        - Checks every ID against the store and against the rest of the batch in one pass.
+        - If any ID conflicts, nothing is added and the conflicts are returned as
+          (position in batch, student ID, reason) tuples.
+        - Otherwise every student is added and indexed, and an empty list is returned.
+        """
+        with self.lock:
+            conflicts = []
+            seen = set()
+            for position, student in enumerate(students):
+                if student.id in self.records:
+                    conflicts.append((position, student.id, "Student ID already exists."))
+                elif student.id in seen:
+                    conflicts.append((position, student.id, "Student ID is repeated in the batch."))
+                seen.add(student.id)
+            if conflicts:
+                return conflicts
+
+            records = [(student.id, StudentRecord.from_student(student)) for student in students]
+            self.records.update(records)
+            _merge_sorted(self.ids, [student.id for student in students])
+            self._index_many(records)
+            self.changes.record(CHANGE_CREATE, [student.id for student in students])
+            ticket = self._log(puts=((student.id, student) for student in students))
+        self.engine.wait(ticket)
+        return []
+
+    def replace(self, student_id: str, student):
+        """
+        Replace the student stored under student_id and re-index it.
+        """
+        with self.lock:
+            self._unindex(student_id, self.records[student_id])
+            record = StudentRecord.from_student(student)
+            self.records[student_id] = record
+            self._index(student_id, record)
+            self.changes.record(CHANGE_UPDATE, [student_id])
+            ticket = self._log(puts=[(student_id, student)])
+        self.engine.wait(ticket)
+
+    def remove(self, student_id: str):
+        """
+        Remove and return the student stored under student_id.
+        """
+        with self.lock:
+            record = self.records.pop(student_id)
+            position = bisect.bisect_left(self.ids, student_id)
+            if position < len(self.ids) and self.ids[position] == student_id:
+                del self.ids[position]
+            self._unindex(student_id, record)
+            self.changes.record(CHANGE_DELETE, [student_id])
+            ticket = self._log(deletes=[student_id])
+        self.engine.wait(ticket)
+        return record.to_student(self.model)
+
+    def update_many(self, changes: List[Tuple[str, dict]]) -> Tuple[List[Tuple[int, str, str]], List]:
+        """
+        Merge partial updates into existing students, all or nothing.
+        - changes: (student ID, {field: new value}) pairs.
+        - If any ID is missing or repeated, nothing is changed and the conflicts are returned
+          as (position in batch, student ID, reason) tuples with an empty list of students.
+        - Every merged student is validated again before anything is changed, so a value
+          that makes a student invalid raises pydantic's ValidationError and changes nothing.
+        - Otherwise returns no conflicts and the updated students, in request order.
+        """
+        with self.lock:
+            conflicts = self._check_existing([student_id for student_id, _ in changes])
+            if conflicts:
+                return conflicts, []
+            old = [(student_id, self.records[student_id]) for student_id, _ in changes]
+            students = [
+                self.model.model_validate({**record.to_student(self.model).model_dump(), **fields})
+                for (_, record), (_, fields) in zip(old, changes)
+            ]
+            new = [(student_id, StudentRecord.from_student(student)) for (student_id, _), student in zip(changes, students)]
+            self._unindex_many(old)
+            self.records.update(new)
+            self._index_many(new)
+            self.changes.record(CHANGE_UPDATE, [student_id for student_id, _ in changes])
+            ticket = self._log(puts=((student_id, student) for (student_id, _), student in zip(changes, students)))
+        self.engine.wait(ticket)
+        return [], students
+
+    def remove_many(self, student_ids: List[str]) -> Tuple[List[Tuple[int, str, str]], List]:
+        """
+        Remove many students, all or nothing.
+        - If any ID is missing or repeated, nothing is removed and the conflicts are returned
+          as (position in batch, student ID, reason) tuples with an empty list of students.
+        - Otherwise returns no conflicts and the removed students, in request order.
+        """
+        with self.lock:
+            conflicts = self._check_existing(student_ids)
+            if conflicts:
+                return conflicts, []
+            old = [(student_id, self.records.pop(student_id)) for student_id in student_ids]
+            _remove_sorted(self.ids, student_ids)
+            self._unindex_many(old)
+            self.changes.record(CHANGE_DELETE, student_ids)
+            ticket = self._log(deletes=student_ids)
+        self.engine.wait(ticket)
+        return [], [record.to_student(self.model) for _, record in old]
+
+    def _check_existing(self, student_ids: List[str]) -> List[Tuple[int, str, str]]:
+        """
+        Return (position, student ID, reason) for every ID that is missing or repeated.
+        """
+        conflicts = []
+        seen = set()
+        for position, student_id in enumerate(student_ids):
+            if student_id not in self.records:
+                conflicts.append((position, student_id, "Student not found."))
+            elif student_id in seen:
+                conflicts.append((position, student_id, "Student ID is repeated in the batch."))
+            seen.add(student_id)
+        return conflicts
+
+    def _index_many(self, records: List[Tuple[str, StudentRecord]]):
+        """
+        Add many (student ID, record) pairs to every secondary index.
+        """
+        for student_id, record in records:
+            _bucket_add(self.by_email, _email_key(record), student_id)
+            _bucket_add(self.by_module, record.module, student_id)
+        self.by_last_name.add_many([(_name_key(record), student_id) for student_id, record in records])
+        self.by_date_of_birth.add_many([(record.dateOfBirth, student_id) for student_id, record in records])
+        self.by_enrollment_date.add_many([(record.enrollmentDate, student_id) for student_id, record in records])
+
+    def _unindex_many(self, records: List[Tuple[str, StudentRecord]]):
+        """
+        Remove many (student ID, record) pairs from every secondary index.
+        """
+        for student_id, record in records:
+            _discard(self.by_email, _email_key(record), student_id)
+            _discard(self.by_module, record.module, student_id)
+        self.by_last_name.remove_many([(_name_key(record), student_id) for student_id, record in records])
+        self.by_date_of_birth.remove_many([(record.dateOfBirth, student_id) for student_id, record in records])
+        self.by_enrollment_date.remove_many([(record.enrollmentDate, student_id) for student_id, record in records])
+
+    def _index(self, student_id: str, record: StudentRecord):
+        """
+        Add the record to every secondary index.
+        """
+        _bucket_add(self.by_email, _email_key(record), student_id)
+        _bucket_add(self.by_module, record.module, student_id)
+        self.by_last_name.add(_name_key(record), student_id)
+        self.by_date_of_birth.add(record.dateOfBirth, student_id)
+        self.by_enrollment_date.add(record.enrollmentDate, student_id)
+
+    def _unindex(self, student_id: str, record: StudentRecord):
+        """
+        Remove the record from every secondary index.
+        """
+        _discard(self.by_email, _email_key(record), student_id)
+        _discard(self.by_module, record.module, student_id)
+        self.by_last_name.remove(_name_key(record), student_id)
+        self.by_date_of_birth.remove(record.dateOfBirth, student_id)
+        self.by_enrollment_date.remove(record.enrollmentDate, student_id)
+
+    # -------------------------
+
+    # Queries
+
+    def page_ids(self, after: Optional[str], limit: Optional[int]) -> List[str]:
+        """
+        Return the IDs of one page of students in ID order.
+        - Starts after the given ID (or at the beginning if no ID is given).
+        - Returns at most limit IDs, or every remaining ID if no limit is given.
+        """
+        start = bisect.bisect_right(self.ids, after) if after is not None else 0
+        end = start + limit if limit is not None else len(self.ids)
+        return self.ids[start:end]
+
+    def page(self, after: Optional[str], limit: Optional[int]) -> List[Tuple[str, object]]:
+        """
+        Return one page of (student ID, student) pairs in ID order (see page_ids).
+        """
+        # Read the IDs and records together so none are deleted in between
+        with self.lock:
+            records = [(student_id, self.records[student_id]) for student_id in self.page_ids(after, limit)]
+        return [(student_id, record.to_student(self.model)) for student_id, record in records]
+
+    def last_id(self) -> Optional[str]:
+        """
+        Return the highest student ID, or None if the store is empty.
+        """
+        return self.ids[-1] if self.ids else None
+
+    def search(
+        self,
+        email: Optional[str] = None,
+        module: Optional[str] = None,
+        last_name: Optional[str] = None,
+        last_name_prefix: Optional[str] = None,
+        born_from: Optional[datetime.date] = None,
+        born_to: Optional[datetime.date] = None,
+        enrolled_from: Optional[datetime.date] = None,
+        enrolled_to: Optional[datetime.date] = None,
+    ) -> List[str]:
+        """
+        Return the sorted IDs of students matching every given filter.
+        - Each filter is answered from its index and sized without copying.
+        - The smallest candidate set drives the search; the other filters are checked per candidate.
+        - Returns every student ID if no filter is given.
+        """
+        # Dates are indexed as ordinals
+        born_from, born_to = _ordinal(born_from), _ordinal(born_to)
+        enrolled_from, enrolled_to = _ordinal(enrolled_from), _ordinal(enrolled_to)
+
+        # Each candidate is (size, ID iterable, predicate checking the same filter on a record)
+        candidates = []
+        if email is not None:
+            matched = _bucket(self.by_email, email.lower())
+            candidates.append((len(matched), matched, lambda r: _email_key(r) == email.lower()))
+        if module is not None:
+            matched = _bucket(self.by_module, module)
+            candidates.append((len(matched), matched, lambda r: r.module == module))
+        if last_name is not None:
+            bounds = self.by_last_name.range_bounds(last_name.casefold(), last_name.casefold())
+            candidates.append((bounds[1] - bounds[0], self.by_last_name.ids(bounds),
+                               lambda r: _name_key(r) == last_name.casefold()))
+        if last_name_prefix is not None:
+            bounds = self.by_last_name.prefix_bounds(last_name_prefix.casefold())
+            candidates.append((bounds[1] - bounds[0], self.by_last_name.ids(bounds),
+                               lambda r: _name_key(r).startswith(last_name_prefix.casefold())))
+        if born_from is not None or born_to is not None:
+            bounds = self.by_date_of_birth.range_bounds(born_from, born_to)
+            candidates.append((bounds[1] - bounds[0], self.by_date_of_birth.ids(bounds),
+                               lambda r: _in_range(r.dateOfBirth, born_from, born_to)))
+        if enrolled_from is not None or enrolled_to is not None:
+            bounds = self.by_enrollment_date.range_bounds(enrolled_from, enrolled_to)
+            candidates.append((bounds[1] - bounds[0], self.by_enrollment_date.ids(bounds),
+                               lambda r: _in_range(r.enrollmentDate, enrolled_from, enrolled_to)))
+
+        if not candidates:
+            return list(self.ids)
+
+        # Drive the search from the smallest candidate set
+        candidates.sort(key=lambda candidate: candidate[0])
+        driver_ids = list(candidates[0][1])
+        checks = [candidate[2] for candidate in candidates[1:]]
+        matches = []
+        for student_id in driver_ids:
+            record = self.records.get(student_id)
+            if record is not None and all(check(record) for check in checks):
+                matches.append(student_id)
+        matches.sort()
+        return matches
+
+# -------------------------
+
+def _put_operation(student_id: str, student) -> str:
+    """
+    Encode a log operation storing student under student_id.
+    """
+    return '["put",' + json.dumps(student_id) + "," + student.model_dump_json() + "]"
+
+def _delete_operation(student_id: str) -> str:
+    """
+    Encode a log operation deleting the student stored under student_id.
+    """
+    return '["del",' + json.dumps(student_id) + "]"
+
+def _merge_sorted(target: List, items: List):
+    """
+    Merge items into the sorted list target in place.
+    - Small batches use binary insertion.
+    - Large batches are appended and the list re-sorted, which is linear for two sorted runs.
+    """
+    if len(items) <= _BULK_SORT_THRESHOLD:
+        for item in items:
+            bisect.insort(target, item)
+    else:
+        target.extend(items)
+        target.sort()
+
+def _remove_sorted(target: List, items: List):
+    """
+    Remove items from the sorted list target in place.
+    - Small batches use binary search and deletion.
+    - Large batches rebuild the list in one filtering pass.
+    """
+    if len(items) <= _BULK_SORT_THRESHOLD:
+        for item in items:
+            position = bisect.bisect_left(target, item)
+            if position < len(target) and target[position] == item:
+                del target[position]
+    else:
+        dropped = set(items)
+        target[:] = [item for item in target if item not in dropped]
+
+def _ordinal(value):
+    """
+    Return a shared ordinal for a date (ordinals and None pass through).
+    """
+    if isinstance(value, datetime.date):
+        value = value.toordinal()
+    if value is None:
+        return None
+    return _ordinals.setdefault(value, value)
+
+def _email_key(record: StudentRecord) -> str:
+    """
+    Return the email index key of a record, reusing the email string when it is already lower case.
+    """
+    key = record.email.lower()
+    return record.email if key == record.email else key
+
+def _name_key(record: StudentRecord) -> str:
+    """
+    Return the interned, case-folded last name index key of a record.
+    """
+    return sys.intern(record.lastName.casefold())
+
+def _bucket(index: Dict[str, Union[str, Set[str]]], key: str) -> Set[str]:
+    """
+    Return the IDs stored under key in a hash index as a set.
+    """
+    bucket = index.get(key)
+    if bucket is None:
+        return set()
+    return {bucket} if isinstance(bucket, str) else bucket
+
+def _bucket_add(index: Dict[str, Union[str, Set[str]]], key: str, student_id: str):
+    """
+    Add a student ID to a hash index bucket.
+    - A key with one ID stores the ID itself; a set is only created for a second ID.
+    """
+    bucket = index.get(key)
+    if bucket is None:
+        index[key] = student_id
+    elif isinstance(bucket, str):
+        if bucket != student_id:
+            index[key] = {bucket, student_id}
+    else:
+        bucket.add(student_id)
+
+def _discard(index: Dict[str, Union[str, Set[str]]], key: str, student_id: str):
+    """
+    Remove a student ID from a hash index bucket, dropping the bucket once it is empty.
+    """
+    bucket = index.get(key)
+    if bucket is None:
+        return
+    if isinstance(bucket, str):
+        if bucket == student_id:
+            del index[key]
+        return
+    bucket.discard(student_id)
+    if len(bucket) == 1:
+        index[key] = next(iter(bucket))
+    elif not bucket:
+        del index[key]
+
+def _in_range(value, low, high) -> bool:
+    """
+    Check whether value lies between low and high (both inclusive, either may be None).
+    """
+    return (low is None or value >= low) and (high is None or value <= high)
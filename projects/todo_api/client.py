@@ -1,86 +1,519 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+import argparse
+import bisect
+import datetime
+import itertools
+import json
+import math
+import random
+import threading
+import time
 import requests
 
 # Base URL for the API endpoints
 # This is the address where the server is listening for requests.
 base_url = "http://127.0.0.1:8000/todolist/"
 
+# =========================
+
+# Shared session, so the functions below reuse connections instead of opening one per request
+_session = requests.Session()
+
 def create_list(list_data):
     """
     Send a POST request to create a batch of to-do lists.
     """
-    response = requests.post(base_url, json=list_data)
+    response = _session.post(base_url, json=list_data)
     return response.json()
 
 def get_all_lists():
     """
     Send a GET request to retrieve all to-do lists.
     """
-    response = requests.get(base_url)
+    response = _session.get(base_url)
     return response.json()
 
 def get_list(lst_id):
     """
     Send a GET request to retrieve a specific to-do list by ID.
     """
-    response = requests.get(f"{base_url}{lst_id}")
+    response = _session.get(f"{base_url}{lst_id}")
     return response.json()
 
 def update_to_do_list(lst_id, list_data):
     """
     Send a PUT request to update a specific to-do list by ID.
     """
-    response = requests.put(f"{base_url}{lst_id}", json=list_data)
+    response = _session.put(f"{base_url}{lst_id}", json=list_data)
     return response.json()
 
 def delete_to_do_list(lst_id):
     """
     Send a DELETE request to remove a specific to-do list by ID.
     """
-    response = requests.delete(f"{base_url}{lst_id}")
+    response = _session.delete(f"{base_url}{lst_id}")
     return response.json()
 
-# Example data for testing
-example_list_data = [
-    {
-        "id": "1",
-        "title": "Task 1",
-        "description": "Description for Task 1",
-        "due_date": "2024-07-24",
-        "status": "pending",
-        "priority": "medium",
-        "creation_date": "2024-07-23"
+# =========================
+
+# Default workload for the load generator
+# A workload file (--workload) only needs the keys it changes; nested dictionaries are merged.
+DEFAULT_WORKLOAD = {
+    # Relative weight of each operation
+    "mix": {"create": 10, "read": 50, "update": 10, "patch": 10, "delete": 5, "list": 10, "search": 5},
+    # Number of to-do lists per create request, uniform between min and max
+    "batch_size": {"min": 1, "max": 10},
+    # Shape of generated to-do lists
+    "payload": {
+        # Words in the title and description, uniform between min and max
+        "title_words": {"min": 2, "max": 8},
+        "description_words": {"min": 0, "max": 40},
+        # Words are drawn from this many distinct words, the common ones far more often (Zipf)
+        "vocabulary": 5000,
+        # Due dates are this many days from today, uniform between min and max
+        "due_in_days": {"min": -30, "max": 90},
+        # Relative weight of each status and priority ("none" for no priority)
+        "status": {"pending": 60, "in_progress": 25, "completed": 15},
+        "priority": {"high": 20, "medium": 40, "low": 25, "none": 15},
+    },
+    # Query parameters of list requests
+    "list": {"limit": 100, "filter_by_status": 0.5},
+}
+
+# Upper bounds, in milliseconds, of the latency histogram's buckets
+HISTOGRAM_BOUNDS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, math.inf]
+
+# =========================
+
+class Call(NamedTuple):
+    """
+    One request of a workload or trace.
+    """
+    op: str
+    method: str
+    path: str
+    params: Optional[dict] = None
+    body: Optional[object] = None
+
+class Workload:
+    """
+    Generates requests in the proportions of a workload specification.
+    - Keeps a pool of the to-do list IDs it has created, so reads, updates and deletes hit
+      existing to-do lists; an ID leaves the pool when its delete is sent.
+    - Falls back to a create when the pool is empty.
+    - Not thread-safe; the caller serialises next_call() and completed().
+    """
+
+    def __init__(self, spec: dict, seed: int = 0, id_prefix: str = "load"):
+        self.spec = spec
+        self.rng = random.Random(seed)
+        self.id_prefix = id_prefix
+        self.numbers = itertools.count()
+        self.ops = list(spec["mix"])
+        self.op_weights = list(itertools.accumulate(spec["mix"][op] for op in self.ops))
+        payload = spec["payload"]
+        self.words = [f"w{number}" for number in range(payload["vocabulary"])]
+        self.word_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(self.words))))
+        # IDs of live to-do lists; a delete swaps a random one with the last and pops it
+        self.live: List[str] = []
+
+    def _choice(self, weights: dict):
+        return self.rng.choices(list(weights), weights=list(weights.values()))[0]
+
+    def _uniform(self, bounds: dict) -> int:
+        return self.rng.randint(bounds["min"], bounds["max"])
+
+    def _text(self, bounds: dict) -> str:
+        return " ".join(self.rng.choices(self.words, cum_weights=self.word_weights, k=self._uniform(bounds)))
+
+    def make_list(self, lst_id: str) -> dict:
+        """
+        Return a to-do list with random content shaped by the workload's payload settings.
+        """
+        payload = self.spec["payload"]
+        today = datetime.date.today()
+        priority = self._choice(payload["priority"])
+        return {
+            "id": lst_id,
+            "title": self._text(payload["title_words"]) or "untitled",
+            "description": self._text(payload["description_words"]) or None,
+            "due_date": (today + datetime.timedelta(days=self._uniform(payload["due_in_days"]))).isoformat(),
+            "status": self._choice(payload["status"]),
+            "priority": None if priority == "none" else priority,
+            "creation_date": today.isoformat(),
+        }
+
+    def _new_id(self) -> str:
+        return f"{self.id_prefix}-{next(self.numbers)}"
+
+    def _add_live(self, lst_id: str):
+        self.live.append(lst_id)
+
+    def _take_live(self) -> str:
+        # Swap a random ID with the last one and pop it
+        position = self.rng.randrange(len(self.live))
+        lst_id = self.live[position]
+        self.live[position] = self.live[-1]
+        self.live.pop()
+        return lst_id
+
+    def create_call(self, count: int) -> Call:
+        return Call("create", "POST", "/todolist/", body=[self.make_list(self._new_id()) for _ in range(count)])
+
+    def next_call(self) -> Call:
+        """
+        Return the next request of the workload.
+        """
+        op = self.ops[bisect.bisect(self.op_weights, self.rng.random() * self.op_weights[-1])]
+        if op == "create" or (op in ("read", "update", "patch", "delete") and not self.live):
+            return self.create_call(self._uniform(self.spec["batch_size"]))
+        if op == "list":
+            settings = self.spec["list"]
+            params = {"limit": settings["limit"]}
+            if self.rng.random() < settings["filter_by_status"]:
+                params["status"] = self._choice(self.spec["payload"]["status"])
+            return Call(op, "GET", "/todolist/", params=params)
+        if op == "search":
+            return Call(op, "GET", "/todolist/search", params={"q": self._text({"min": 1, "max": 2})})
+        if op == "delete":
+            return Call(op, "DELETE", f"/todolist/{self._take_live()}")
+        lst_id = self.live[self.rng.randrange(len(self.live))]
+        if op == "read":
+            return Call(op, "GET", f"/todolist/{lst_id}")
+        if op == "update":
+            return Call(op, "PUT", f"/todolist/{lst_id}", body=self.make_list(lst_id))
+        if op == "patch":
+            return Call(op, "PATCH", f"/todolist/{lst_id}", body={"status": self._choice(self.spec["payload"]["status"])})
+        raise ValueError(f"Unknown operation {op!r} in the workload mix.")
+
+    def completed(self, call: Call, status: Optional[int]):
+        """
+        Record the outcome of a call: created to-do lists join the pool.
+        """
+        if call.op == "create" and status is not None and status < 400:
+            for lst in call.body:
+                self._add_live(lst["id"])
+
+def merge_workload(base: dict, changes: dict) -> dict:
+    """
+    Return base with the keys in changes replaced, merging nested dictionaries.
+    - The operation mix is replaced as a whole, so a file can leave operations out.
+    """
+    merged = dict(base)
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict) and key != "mix":
+            merged[key] = merge_workload(base[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+# =========================
+
+class Results:
+    """
+    Collects the outcome of every request, and optionally writes them to a trace file.
+    - Trace lines hold the request (method, path, query parameters and body), its offset from
+      the start of the run in seconds, its status and its latency, so the run can be replayed.
+    """
+
+    def __init__(self, trace_path: Optional[str] = None):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Counter] = {}
+        self.lock = threading.Lock()
+        self.trace = open(trace_path, "w") if trace_path else None
+
+    def add(self, call: Call, offset: float, status: Optional[int], latency: float):
+        """
+        - status: The response status, or None if the request failed without one.
+        - latency: Seconds from when the request was due to be sent until its response.
+        """
+        with self.lock:
+            self.latencies.setdefault(call.op, []).append(latency)
+            self.statuses.setdefault(call.op, Counter())[status if status is not None else "exception"] += 1
+            if self.trace is not None:
+                self.trace.write(json.dumps({
+                    "t": round(offset, 6), "op": call.op, "method": call.method, "path": call.path,
+                    "params": call.params, "body": call.body, "status": status, "latency_ms": round(latency * 1000, 3),
+                }) + "\n")
+
+    def close(self):
+        if self.trace is not None:
+            self.trace.close()
+
+def drive(url: str, next_call, completed, results: Results, concurrency: int, schedule=None,
+          duration: Optional[float] = None) -> float:
+    """
+    Send requests from concurrency threads until next_call() returns None, and return the run time.
+    - next_call(number) returns request number's Call, or None when there are no more.
+    - completed(call, status) is told the outcome of every call.
+    - schedule(number): Seconds after the start at which request number is due (open loop).
+      Latency is measured from that time, so a slow server cannot hide its queueing delay by
+      holding back later requests. Without it, each thread sends as soon as it has a response
+      (closed loop), and concurrency alone sets the load.
+    - duration: Stop issuing requests after this many seconds.
+    """
+    lock = threading.Lock()
+    counter = itertools.count()
+    started = time.perf_counter()
+
+    def worker():
+        with requests.Session() as session:
+            while True:
+                with lock:
+                    number = next(counter)
+                    due = started + schedule(number) if schedule is not None else None
+                    if duration is not None and (due or time.perf_counter()) - started >= duration:
+                        return
+                    call = next_call(number)
+                if call is None:
+                    return
+                if due is not None:
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                sent = time.perf_counter()
+                try:
+                    response = session.request(call.method, url + call.path, params=call.params, json=call.body)
+                    status = response.status_code
+                except requests.RequestException:
+                    status = None
+                finished = time.perf_counter()
+                with lock:
+                    completed(call, status)
+                results.add(call, (due or sent) - started, status, finished - (due or sent))
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return time.perf_counter() - started
+
+# =========================
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Return the nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def summarise(results: Results, run_time: float) -> dict:
+    """
+    Return throughput, error rate and latency percentiles per operation and overall, and the
+    latency histogram of every request.
+    """
+    rows = {}
+    everything = []
+    for op in sorted(results.latencies):
+        latencies = sorted(results.latencies[op])
+        everything.extend(latencies)
+        rows[op] = _summary_row(latencies, results.statuses[op], run_time)
+    everything.sort()
+    rows["all"] = _summary_row(everything, sum(results.statuses.values(), Counter()), run_time)
+    histogram = [0] * len(HISTOGRAM_BOUNDS_MS)
+    for latency in everything:
+        histogram[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, latency * 1000)] += 1
+    return {
+        "run_time_s": round(run_time, 3),
+        "operations": rows,
+        "histogram": [{"le_ms": bound if bound != math.inf else None, "count": count}
+                      for bound, count in zip(HISTOGRAM_BOUNDS_MS, histogram)],
     }
-]
 
-# Test API functions
-# The following lines of code test the functions to ensure they are working as expected.
+def _summary_row(latencies: list, statuses: Counter, run_time: float) -> dict:
+    errors = sum(count for status, count in statuses.items() if status == "exception" or status >= 400)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / run_time, 2) if run_time else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+def print_summary(summary: dict):
+    print(f"\nRun time {summary['run_time_s']} s")
+    print(f"{'operation':<10} {'requests':>9} {'rps':>9} {'errors':>7} {'err %':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  statuses")
+    for op, row in summary["operations"].items():
+        print(f"{op:<10} {row['requests']:>9} {row['throughput_rps']:>9.1f} {row['errors']:>7} "
+              f"{row['error_rate'] * 100:>6.2f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+              f"{row['p99_ms']:>8.2f} {row['max_ms']:>8.2f}  {row['statuses']}")
+    print("\nLatency histogram")
+    total = sum(bucket["count"] for bucket in summary["histogram"]) or 1
+    for bucket in summary["histogram"]:
+        label = f"<= {bucket['le_ms']:g} ms" if bucket["le_ms"] is not None else "slower"
+        print(f"{label:>12} {bucket['count']:>9} {'#' * round(50 * bucket['count'] / total)}")
+
+# =========================
+
+def run_workload(args):
+    """
+    Generate requests from a workload, at a target rate (--rate) or as fast as --concurrency allows.
+    """
+    spec = DEFAULT_WORKLOAD
+    if args.workload:
+        with open(args.workload) as workload_file:
+            spec = merge_workload(DEFAULT_WORKLOAD, json.load(workload_file))
+    id_prefix = args.id_prefix or f"load-{int(time.time())}"
+    workload = Workload(spec, seed=args.seed, id_prefix=id_prefix)
+    url = args.url.rstrip("/")
+
+    # Create the starting to-do lists, so reads and updates have something to hit from the start
+    if args.preload:
+        print(f"Creating {args.preload} to-do lists...")
+        preload = Results()
+        calls = [workload.create_call(min(500, args.preload - start)) for start in range(0, args.preload, 500)]
+        drive(url, lambda number: calls[number] if number < len(calls) else None, workload.completed,
+              preload, args.concurrency)
+
+    results = Results(args.record)
+    schedule = (lambda number: number / args.rate) if args.rate else None
+    limit = args.requests
+    run_time = drive(
+        url,
+        lambda number: workload.next_call() if limit is None or number < limit else None,
+        workload.completed,
+        results,
+        args.concurrency,
+        schedule=schedule,
+        duration=args.duration,
+    )
+    results.close()
+    return summarise(results, run_time)
 
-print("Creating list...")
-# Calls the function to create a new to-do item and prints the response from the server.
-print(create_list(example_list_data))
+def replay_trace(args):
+    """
+    Send the requests of a recorded trace with their recorded timing, scaled by --speed.
+    - Run against a server in the state the trace started from (usually empty), so its
+      creates, reads and deletes line up.
+    """
+    with open(args.trace) as trace:
+        entries = [json.loads(line) for line in trace if line.strip()]
+    entries.sort(key=lambda entry: entry["t"])
+    calls = [Call(entry["op"], entry["method"], entry["path"], entry.get("params"), entry.get("body"))
+             for entry in entries]
+    results = Results(args.record)
+    run_time = drive(
+        args.url.rstrip("/"),
+        lambda number: calls[number] if number < len(calls) else None,
+        lambda call, status: None,
+        results,
+        args.concurrency,
+        schedule=None if args.as_fast_as_possible else (
+            lambda number: entries[number]["t"] / args.speed if number < len(entries) else 0.0
+        ),
+    )
+    results.close()
+    return summarise(results, run_time)
+
+# =========================
 
-print("Getting all lists...")
-print(get_all_lists())
+def demo():
+    """
+    Create, read, update and delete one to-do list, printing every response.
+    """
+    # Example data for testing
+    example_list_data = [
+        {
+            "id": "1",
+            "title": "Task 1",
+            "description": "Description for Task 1",
+            "due_date": "2024-07-24",
+            "status": "pending",
+            "priority": "medium",
+            "creation_date": "2024-07-23"
+        }
+    ]
 
-print("Getting list with ID 1...")
-print(get_list("1"))
+    print("Creating list...")
+    # Calls the function to create a new to-do item and prints the response from the server.
+    print(create_list(example_list_data))
 
-# Make a copy of the first item in the example list
-# This creates a duplicate of the to-do item so we can make changes without altering the original data.
-updated_list_data = example_list_data[0].copy()
+    print("Getting all lists...")
+    print(get_all_lists())
 
-# Update the title of the copied to-do item
-# This changes the title of the copied item to "Updated Task 1".
-updated_list_data["title"] = "Updated Task 1"
+    print("Getting list with ID 1...")
+    print(get_list("1"))
 
-print("Updating list...")
-print(update_to_do_list("1", updated_list_data))
+    # Make a copy of the first item in the example list
+    # This creates a duplicate of the to-do item so we can make changes without altering the original data.
+    updated_list_data = example_list_data[0].copy()
 
-print("Deleting list...")
-print(delete_to_do_list("1"))
+    # Update the title of the copied to-do item
+    # This changes the title of the copied item to "Updated Task 1".
+    updated_list_data["title"] = "Updated Task 1"
 
-print("Getting all lists after deletion...")
-print(get_all_lists())
+    print("Updating list...")
+    print(update_to_do_list("1", updated_list_data))
+
+    print("Deleting list...")
+    print(delete_to_do_list("1"))
+
+    print("Getting all lists after deletion...")
+    print(get_all_lists())
+
+def main():
+    """
+    Command line entry point.
+    - demo: the original walk through every endpoint.
+    - run: generate load from a workload; --record writes a trace of every request.
+    - replay: send the requests of a trace again with their original timing.
+    """
+    parser = argparse.ArgumentParser(description="Client and load generator for the to-do list API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="base URL of the running server")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="number of client threads (the most requests in flight at once)")
+    parser.add_argument("--output", help="file to write the summary to, as JSON")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("demo", help="create, read, update and delete one to-do list")
+
+    run = commands.add_parser("run", help="generate load from a workload")
+    run.add_argument("--workload", help="JSON file with the workload settings to change (see DEFAULT_WORKLOAD)")
+    run.add_argument("--rate", type=float, help="target requests per second; without it, run closed loop")
+    run.add_argument("--duration", type=float, help="seconds to run for")
+    run.add_argument("--requests", type=int, help="number of requests to send")
+    run.add_argument("--preload", type=int, default=0, help="to-do lists to create before the run")
+    run.add_argument("--id-prefix", help="prefix of created to-do list IDs (default: load-<timestamp>)")
+    run.add_argument("--seed", type=int, default=0, help="random seed")
+    run.add_argument("--record", help="file to write a trace of every request to (JSON lines)")
+
+    replay = commands.add_parser("replay", help="replay a recorded trace")
+    replay.add_argument("trace", help="trace file written by run --record")
+    replay.add_argument("--speed", type=float, default=1.0, help="replay this many times faster than recorded")
+    replay.add_argument("--as-fast-as-possible", action="store_true", help="ignore the recorded timing")
+    replay.add_argument("--record", help="file to write a trace of the replay to")
+    args = parser.parse_args()
+
+    if args.command in (None, "demo"):
+        global base_url
+        base_url = args.url.rstrip("/") + "/todolist/"
+        demo()
+        return
+    if args.command == "run":
+        if args.requests is None and args.duration is None:
+            parser.error("run needs --requests or --duration")
+        summary = run_workload(args)
+    else:
+        summary = replay_trace(args)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(summary, output, indent=2)
+        print("Summary written to", args.output)
+
+# Only runs when this file is executed directly, so other code can import the client.
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        _session.close()
 
 
 """
@@ -100,4 +533,10 @@ curl -X POST http://127.0.0.1:8000/todolist/ \
 # Test GET request
 curl -X GET http://127.0.0.1:8000/todolist/ \
      -H "Content-Type: application/json"
-"""
\ No newline at end of file
+
+# Generate load: 200 requests per second for 30 seconds, recording a trace
+python client.py run --rate 200 --duration 30 --preload 1000 --record trace.jsonl
+
+# Replay the trace twice as fast against a fresh server
+python client.py replay trace.jsonl --speed 2
+"""
@@ -1,17 +1,38 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, model_validator
+from typing import Dict, List, Optional
 from enum import Enum
+from logging_config import SampledRoute, configure_logging
+from todo_store import ToDoStore, VersionConflict
+from todo_storage import open_engine
+from todo_archive import open_archive
+from contextlib import asynccontextmanager
 import datetime
 import logging
 
+# Start archiving old completed to-do lists (if enabled) when the application starts;
+# stop it, commit queued writes and close the storage engine when the application shuts down
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if archiver is not None:
+        archiver.start()
+    yield
+    if archiver is not None:
+        await archiver.stop()
+        toDoList_archive.close()
+    toDoList_db.close()
+
 # Initialize FastAPI application
 # Create an instance of FastAPI which will be used to define routes and handle requests
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# Routes record their name for per-route log sampling (see logging_config)
+app.router.route_class = SampledRoute
 
 # Set up logging to capture information, errors, etc.
-# Configure logging to display messages of INFO level and higher
-logging.basicConfig(level=logging.INFO)
+# Records are queued and written by a background thread; see logging_config
+# for the environment variables that control the level and sampling.
+configure_logging()
 
 # Define an enumeration for status options
 # This allows the status of a to-do list to be one of the predefined values
@@ -27,6 +48,20 @@ class PriorityEnum(str, Enum):
     medium = "medium"
     high = "high"
 
+# Define an enumeration for the fields GET /todolist/ can sort by
+class SortEnum(str, Enum):
+    id = "id"
+    title = "title"
+    due_date = "due_date"
+    priority = "priority"
+    creation_date = "creation_date"
+    last_updated_date = "last_updated_date"
+
+# Define an enumeration for sort directions
+class OrderEnum(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
 # =========================
 
 # Define To-Do List model using Pydantic
@@ -39,56 +74,280 @@ class ToDoList(BaseModel):
     status: StatusEnum
     priority: Optional[PriorityEnum] = None
     creation_date: datetime.date
+    # Set by the server whenever the to-do list is updated
     last_updated_date: Optional[datetime.date] = None
+    # Set by the server on every write; any value sent by the client is ignored
+    version: int = 0
+
+# Define the model for a partial update of a to-do list
+# Only the fields given replace the stored values; id and version cannot be changed.
+class ToDoListPatch(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    due_date: Optional[datetime.date] = None
+    status: Optional[StatusEnum] = None
+    priority: Optional[PriorityEnum] = None
+    creation_date: Optional[datetime.date] = None
+
+    @model_validator(mode="after")
+    def check_required_fields(self):
+        # Fields a to-do list must have cannot be cleared
+        for field in ("title", "due_date", "status", "creation_date"):
+            if field in self.model_fields_set and getattr(self, field) is None:
+                raise ValueError(f"{field} cannot be null.")
+        return self
+
+# Define the response model for to-do list searches
+class ToDoListSearchResult(BaseModel):
+    # Total number of to-do lists matching the search
+    count: int
+    # The best matches, best first (limited by the request's limit)
+    results: List[ToDoList]
+
+# Define the response model for to-do list counts
+class ToDoListStats(BaseModel):
+    # Total number of to-do lists
+    total: int
+    # Number of to-do lists with each status
+    by_status: Dict[str, int]
+    # Number of to-do lists with each priority ("none" for no priority)
+    by_priority: Dict[str, int]
+    # Number of to-do lists with each priority, for each status
+    by_status_priority: Dict[str, Dict[str, int]]
 
 # =========================
 
 # In-memory storage for To-Do Lists
-# A dictionary to store to-do lists temporarily
-toDoList_db: Dict[str, ToDoList] = {}
+# A store of to-do lists keyed by ID, with a schedule of open to-do lists
+# ordered by due date and priority (see todo_store).
+# Set TODO_STORAGE=sqlite to keep them in a SQLite file across restarts (see todo_storage);
+# reads are still served from memory and writes are committed in batches.
+toDoList_db = ToDoStore(ToDoList, engine=open_engine())
+toDoList_db.load()
+
+# Archive for old completed to-do lists
+# Set TODO_ARCHIVE_AFTER_DAYS to move to-do lists completed that many days ago out of
+# toDoList_db into a compressed SQLite file, so memory holds only active work (see todo_archive).
+# Archived to-do lists are served by the /todolist/archive endpoints.
+toDoList_archive, archiver = open_archive(toDoList_db, ToDoList)
 
 # =========================
 
 # Endpoint to create a batch of to-do lists
 # This endpoint accepts a list of to-do lists and adds them to the in-memory database
 @app.post("/todolist/", response_model=List[ToDoList])
-def create_to_do_list(lists: List[ToDoList]):
-    """
-    Create a batch of to-do lists.
-    """
-    created_lists = []
-    for lst in lists:
-        if lst.id in toDoList_db:
-            logging.error(f"ToDoList ID {lst.id} already exists.")
-            raise HTTPException(status_code=400, detail=f"ToDoList ID {lst.id} already exists.")
-        toDoList_db[lst.id] = lst
-        created_lists.append(lst)
-        logging.info(f"Created list with ID {lst.id}")
+async def create_to_do_list(lists: List[ToDoList]):
+    """
+    Create a batch of to-do lists, all or nothing.
+    - The batch is checked and added in the thread pool, under the store's lock.
+    - If any ID already exists or is repeated in the batch, nothing is added and a 400
+      error reports the first conflict.
+    - Returns once the new to-do lists are committed by the storage engine.
+    """
+    conflicts, created_lists = await run_in_threadpool(toDoList_db.add_many, lists)
+    if conflicts:
+        reason = conflicts[0][2]
+        logging.error("Rejected batch of %d to-do lists: %s", len(lists), reason)
+        raise HTTPException(status_code=400, detail=reason)
+    for lst in created_lists:
+        logging.info("Created list with ID %s", lst.id)
+    await toDoList_db.flushed()
     return created_lists
 
 # =========================
 
 # Endpoint to get all to-do lists
-# This endpoint returns all to-do lists stored in the in-memory database
+# This endpoint returns the to-do lists stored in the in-memory database
 @app.get("/todolist/", response_model=List[ToDoList])
-def get_to_do_list():
+def get_to_do_list(
+    response: Response,
+    status: Optional[StatusEnum] = None,
+    priority: Optional[PriorityEnum] = None,
+    sort: Optional[SortEnum] = None,
+    order: OrderEnum = OrderEnum.asc,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+):
     """
-    Retrieve all to-do lists.
+    Retrieve to-do lists, optionally filtered, sorted and paginated.
+    - status, priority: Only to-do lists with this status and/or priority.
+    - sort, order: The field to sort by and the direction; ties are ordered by ID.
+      Without sort, to-do lists are returned in the order they were created.
+    - offset, limit: The page of results to return. Returns every match if limit is not given.
+    - Sets X-Total-Count to the number of matches before pagination.
     """
-    logging.info(f"Retrieving all to-do lists. Total count: {len(toDoList_db)}")
-    return list(toDoList_db.values())
+    logging.info("Retrieving all to-do lists. Total count: %d", len(toDoList_db))
+    total, lists = toDoList_db.select(
+        status=status,
+        priority=priority,
+        sort=sort.value if sort is not None else None,
+        descending=order == OrderEnum.desc,
+        offset=offset,
+        limit=limit,
+    )
+    response.headers["X-Total-Count"] = str(total)
+    return lists
+
+# Endpoint to count to-do lists by status and priority
+# Declared before /todolist/{lst_id} so "stats" is not taken as an ID
+@app.get("/todolist/stats", response_model=ToDoListStats)
+def get_to_do_list_stats():
+    """
+    Count to-do lists by status, by priority and by both.
+    - Read from the store's live bucket counters, without scanning the to-do lists.
+    """
+    counts = toDoList_db.counts()
+    priorities = [priority.value for priority in PriorityEnum] + [None]
+    by_status_priority = {
+        status.value: {priority or "none": counts.get((status.value, priority), 0) for priority in priorities}
+        for status in StatusEnum
+    }
+    return {
+        "total": len(toDoList_db),
+        "by_status": {status: sum(row.values()) for status, row in by_status_priority.items()},
+        "by_priority": {
+            priority or "none": sum(row[priority or "none"] for row in by_status_priority.values())
+            for priority in priorities
+        },
+        "by_status_priority": by_status_priority,
+    }
+
+# =========================
+
+# Endpoint to get archived to-do lists by completion date
+# Declared before /todolist/{lst_id} so "archive" is not taken as an ID
+@app.get("/todolist/archive", response_model=List[ToDoList])
+def get_archived_to_do_lists(
+    response: Response,
+    after: Optional[datetime.date] = None,
+    before: Optional[datetime.date] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+):
+    """
+    Retrieve archived to-do lists, ordered by completion date, then ID.
+    - after, before: Only to-do lists completed on or after / on or before these dates.
+    - offset, limit: The page of results to return.
+    - Sets X-Total-Count to the number of matches before pagination.
+    - Returns nothing when archiving is off.
+    """
+    total, lists = (0, []) if toDoList_archive is None else toDoList_archive.completed_between(
+        after=after, before=before, offset=offset, limit=limit
+    )
+    response.headers["X-Total-Count"] = str(total)
+    return lists
+
+# Endpoint to get an archived to-do list by ID
+@app.get("/todolist/archive/{lst_id}", response_model=ToDoList)
+def get_archived_to_do_list_by_id(lst_id: str):
+    """
+    Retrieve an archived to-do list by its ID.
+    """
+    lst = toDoList_archive.get(lst_id) if toDoList_archive is not None else None
+    if lst is None:
+        raise HTTPException(status_code=404, detail="Archived ToDoList not found.")
+    return lst
+
+# Endpoint to search to-do lists by keyword
+# Declared before /todolist/{lst_id} so "search" is not taken as an ID
+@app.get("/todolist/search", response_model=ToDoListSearchResult)
+def search_to_do_lists(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1)):
+    """
+    Search the titles and descriptions of to-do lists.
+    - q: Words that must all appear (case-insensitive). A word ending in "*" matches any
+      word starting with it, e.g. "rep*" matches "report" and "repair".
+    - Results are ranked by relevance; words in the title count more than in the description.
+    - Returns the total number of matches and up to limit of the best.
+    """
+    count, results = toDoList_db.search(q, limit)
+    logging.info("Searched to-do lists: %d matches.", count)
+    return {"count": count, "results": results}
+
+# Endpoint to get the next to-do lists due
+# Declared before /todolist/{lst_id} so "due" is not taken as an ID
+@app.get("/todolist/due", response_model=List[ToDoList])
+def get_due_to_do_lists(
+    before: Optional[datetime.date] = None,
+    after: Optional[datetime.date] = None,
+    limit: int = Query(100, ge=1),
+):
+    """
+    Retrieve the next open (not completed) to-do lists due.
+    - before: Only to-do lists due on or before this date.
+    - after: Only to-do lists due on or after this date.
+    - limit: The maximum number to return.
+    - Ordered by due date, then priority (high, medium, low, none).
+    """
+    return toDoList_db.due(before=before, after=after, limit=limit)
+
+# Endpoint to get the overdue to-do lists
+# Declared before /todolist/{lst_id} so "overdue" is not taken as an ID
+@app.get("/todolist/overdue", response_model=List[ToDoList])
+def get_overdue_to_do_lists(limit: int = Query(100, ge=1)):
+    """
+    Retrieve open (not completed) to-do lists whose due date has passed.
+    - Ordered by due date, then priority (high, medium, low, none).
+    """
+    return toDoList_db.overdue(datetime.date.today(), limit=limit)
+
+# =========================
+
+def _etag(lst: ToDoList) -> str:
+    """
+    Return the ETag of a to-do list: its version, quoted.
+    """
+    return f'"{lst.version}"'
+
+def _parse_if_match(if_match: Optional[str]) -> Optional[set]:
+    """
+    Turn an If-Match header into the set of versions it accepts.
+    - Returns None (any version) when the header is missing or "*".
+    - Tags that are not versions of this API match nothing, so the write fails with 412.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = set()
+    for tag in if_match.split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag.isdigit():
+            versions.add(int(tag))
+    return versions
+
+def _conditional_write(response: Response, write, *args):
+    """
+    Run a store write, turning a missing to-do list into 404 and a version conflict into 412.
+    - Sets the ETag header to the version written (or, for 412, the version stored).
+    - The write is only queued for the storage engine; callers await toDoList_db.flushed().
+    """
+    try:
+        lst = write(*args)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="ToDoList not found.")
+    except VersionConflict as conflict:
+        logging.warning("Rejected write to to-do list %s: version %d does not match If-Match.",
+                        conflict.current.id, conflict.current.version)
+        raise HTTPException(
+            status_code=412,
+            detail="ToDoList has been modified; fetch it again or retry with its current ETag.",
+            headers={"ETag": _etag(conflict.current)},
+        )
+    response.headers["ETag"] = _etag(lst)
+    return lst
 
 # =========================
 
 # Endpoint to get a specific to-do list by ID
 # This endpoint returns a single to-do list identified by its ID
 @app.get("/todolist/{lst_id}", response_model=ToDoList)
-def get_to_do_list_by_id(lst_id: str):
+def get_to_do_list_by_id(lst_id: str, response: Response):
     """
     Retrieve a specific to-do list by its ID.
+    - Sets the ETag header to the to-do list's version, for use with If-Match.
     """
     if lst_id in toDoList_db:
-        return toDoList_db[lst_id]
+        lst = toDoList_db[lst_id]
+        response.headers["ETag"] = _etag(lst)
+        return lst
     else:
         raise HTTPException(status_code=404, detail="ToDoList not found.")
 
@@ -97,29 +356,54 @@ def get_to_do_list_by_id(lst_id: str):
 # Endpoint to update a specific to-do list by ID
 # This endpoint updates a to-do list identified by its ID with new data
 @app.put("/todolist/{lst_id}", response_model=ToDoList)
-def update_to_do_list(lst_id: str, list_data: ToDoList):
+async def update_to_do_list(
+    lst_id: str,
+    list_data: ToDoList,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+):
     """
     Update a specific to-do list by its ID.
+    - Sets last_updated_date to today and gives the to-do list a new version.
+    - If-Match: Only update if the stored version matches one of these ETags; otherwise 412.
     """
-    if lst_id in toDoList_db:
-        toDoList_db[lst_id] = list_data
-        return list_data
-    else:
-        raise HTTPException(status_code=404, detail="ToDoList not found.")
+    list_data = list_data.model_copy(update={"last_updated_date": datetime.date.today()})
+    lst = _conditional_write(response, toDoList_db.replace, lst_id, list_data, _parse_if_match(if_match))
+    await toDoList_db.flushed()
+    return lst
+
+# Endpoint to partially update a specific to-do list by ID
+# Only the fields in the request body are changed, so no read is needed before the write
+@app.patch("/todolist/{lst_id}", response_model=ToDoList)
+async def patch_to_do_list(
+    lst_id: str,
+    changes: ToDoListPatch,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+):
+    """
+    Change some fields of a specific to-do list by its ID.
+    - Sets last_updated_date to today and gives the to-do list a new version.
+    - If-Match: Only update if the stored version matches one of these ETags; otherwise 412.
+    """
+    fields = {**changes.model_dump(exclude_unset=True), "last_updated_date": datetime.date.today()}
+    lst = _conditional_write(response, toDoList_db.patch, lst_id, fields, _parse_if_match(if_match))
+    await toDoList_db.flushed()
+    return lst
 
 # =========================
 
 # Endpoint to delete a specific to-do list by ID
 # This endpoint removes a to-do list identified by its ID from the in-memory database
 @app.delete("/todolist/{lst_id}", response_model=ToDoList)
-def delete_to_do_list(lst_id: str):
+async def delete_to_do_list(lst_id: str, response: Response, if_match: Optional[str] = Header(None)):
     """
     Delete a specific to-do list by its ID.
+    - If-Match: Only delete if the stored version matches one of these ETags; otherwise 412.
     """
-    if lst_id in toDoList_db:
-        return toDoList_db.pop(lst_id)
-    else:
-        raise HTTPException(status_code=404, detail="ToDoList not found.")
+    lst = _conditional_write(response, toDoList_db.remove, lst_id, _parse_if_match(if_match))
+    await toDoList_db.flushed()
+    return lst
 
 # =========================
 
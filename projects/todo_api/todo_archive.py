@@ -0,0 +1,228 @@
+from typing import List, Optional, Tuple
+from todo_store import completed_on
+import asyncio
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+
+# =========================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    completed_on INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archive_completed_on ON archive (completed_on, id);
+"""
+
+# Preset dictionary for compressing one to-do list at a time
+# A single record is too short for zlib to learn much from, so the field names and common
+# values are given up front; records then compress to well under half their size.
+# Changing it makes the records already archived unreadable.
+_ZDICT = (
+    b'{"id":"","title":"","description":null,"due_date":"20","status":"completed",'
+    b'"priority":null,"low","medium","high","creation_date":"20","last_updated_date":"20","version":'
+)
+
+# =========================
+
+def _compress(data: bytes) -> bytes:
+    compressor = zlib.compressobj(level=6, zdict=_ZDICT)
+    return compressor.compress(data) + compressor.flush()
+
+def _decompress(data: bytes) -> bytes:
+    decompressor = zlib.decompressobj(zdict=_ZDICT)
+    return decompressor.decompress(data) + decompressor.flush()
+
+# =========================
+
+class ToDoArchive:
+    """
+    Cold tier for completed to-do lists, in a local SQLite file.
+    - Each to-do list is stored as compressed JSON, with its ID, version and completion date
+      (see todo_store.completed_on) as columns.
+    - Look-ups by ID and by completion date range use indexes, so nothing is held in memory
+      and the archive can grow without growing the process.
+    - Archived to-do lists are read-only.
+    """
+
+    def __init__(self, model, path: str):
+        # Model class of the archived to-do lists, used when reading them
+        self.model = model
+        self.path = path
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # A to-do list is removed from the hot store once archived, so the archive must be on disk first
+        self.connection.execute("PRAGMA synchronous=FULL")
+        self.connection.executescript(_SCHEMA)
+        self.lock = threading.Lock()
+
+    def put(self, lists: List):
+        """
+        Archive a batch of to-do lists in one transaction, replacing any with the same ID.
+        """
+        rows = [
+            (lst.id, lst.version, completed_on(lst).toordinal(), _compress(lst.model_dump_json().encode()))
+            for lst in lists
+        ]
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.connection.executemany("INSERT OR REPLACE INTO archive VALUES (?, ?, ?, ?)", rows)
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def discard(self, lists: List):
+        """
+        Remove to-do lists from the archive, if it still holds them at the same version.
+        """
+        with self.lock:
+            self.connection.executemany(
+                "DELETE FROM archive WHERE id = ? AND version = ?",
+                [(lst.id, lst.version) for lst in lists],
+            )
+
+    def get(self, lst_id: str):
+        """
+        Return the archived to-do list with this ID, or None.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT data FROM archive WHERE id = ?", (lst_id,)).fetchone()
+        return self.model.model_validate_json(_decompress(row[0])) if row is not None else None
+
+    def completed_between(
+        self,
+        after: Optional[datetime.date] = None,
+        before: Optional[datetime.date] = None,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> Tuple[int, List]:
+        """
+        Return the number of archived to-do lists completed in a date range and one page of them.
+        - after, before: Only to-do lists completed on or after / on or before these dates.
+        - Ordered by completion date, then ID.
+        """
+        low = after.toordinal() if after is not None else 0
+        high = before.toordinal() if before is not None else datetime.date.max.toordinal()
+        with self.lock:
+            total = self.connection.execute(
+                "SELECT COUNT(*) FROM archive WHERE completed_on BETWEEN ? AND ?", (low, high)
+            ).fetchone()[0]
+            rows = self.connection.execute(
+                "SELECT data FROM archive WHERE completed_on BETWEEN ? AND ? ORDER BY completed_on, id LIMIT ? OFFSET ?",
+                (low, high, limit, offset),
+            ).fetchall()
+        return total, [self.model.model_validate_json(_decompress(row[0])) for row in rows]
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+# =========================
+
+class Archiver:
+    """
+    Background task that moves old completed to-do lists from the store to the archive.
+    - Every interval seconds, to-do lists completed more than age_days ago are archived in
+      batches of batch_size, then removed from the store.
+    - A batch is committed to the archive before it leaves the store, so a crash in between
+      leaves a to-do list in both tiers, never in neither; the next run archives it again.
+    - A to-do list changed while its batch was being archived stays in the store, and its
+      archived copy is discarded.
+    - The work runs in a thread, between request handlers' writes; the store lock is held
+      only to pick a batch and to remove it.
+    """
+
+    def __init__(self, store, archive: ToDoArchive, age_days: int, interval: float = 3600.0, batch_size: int = 500):
+        self.store = store
+        self.archive = archive
+        self.age_days = age_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.stopping = False
+        self.task = None
+        self.wake = None
+
+    def run_once(self, today: datetime.date) -> int:
+        """
+        Archive every to-do list completed before today - age_days and return how many were moved.
+        """
+        cutoff = today - datetime.timedelta(days=self.age_days)
+        moved = 0
+        while not self.stopping:
+            lists = self.store.completed_before(cutoff, self.batch_size)
+            if not lists:
+                break
+            self.archive.put(lists)
+            evicted = self.store.evict(lists)
+            if len(evicted) < len(lists):
+                evicted_ids = {lst.id for lst in evicted}
+                self.archive.discard([lst for lst in lists if lst.id not in evicted_ids])
+            moved += len(evicted)
+            if len(lists) < self.batch_size:
+                break
+        return moved
+
+    def start(self):
+        """
+        Start archiving in the background of the running event loop.
+        """
+        self.wake = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self.stopping:
+            try:
+                moved = await asyncio.to_thread(self.run_once, datetime.date.today())
+                if moved:
+                    logging.info("Archived %d completed to-do lists.", moved)
+            except Exception:
+                logging.exception("Failed to archive completed to-do lists; retrying in %s s.", self.interval)
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        """
+        Stop archiving, letting the batch in progress finish.
+        """
+        self.stopping = True
+        if self.task is not None:
+            self.wake.set()
+            await self.task
+
+# =========================
+
+def open_archive(store, model):
+    """
+    Create the archive and archiver selected by environment variables.
+    - TODO_ARCHIVE_AFTER_DAYS: archive to-do lists completed at least this many days ago.
+      Archiving is off when unset; returns (None, None) then.
+    - TODO_ARCHIVE_PATH: SQLite file of the archive (default ./todo_archive.db).
+    - TODO_ARCHIVE_INTERVAL_S: seconds between archiving runs (default 3600).
+    - TODO_ARCHIVE_BATCH: to-do lists moved per transaction (default 500).
+    """
+    age_days = os.environ.get("TODO_ARCHIVE_AFTER_DAYS")
+    if age_days is None:
+        return None, None
+    archive = ToDoArchive(model, os.environ.get("TODO_ARCHIVE_PATH", "./todo_archive.db"))
+    archiver = Archiver(
+        store,
+        archive,
+        age_days=int(age_days),
+        interval=float(os.environ.get("TODO_ARCHIVE_INTERVAL_S", "3600")),
+        batch_size=int(os.environ.get("TODO_ARCHIVE_BATCH", "500")),
+    )
+    return archive, archiver
@@ -0,0 +1,146 @@
+from typing import Dict, List, Optional, Tuple
+import bisect
+import heapq
+import math
+import re
+
+# =========================
+
+# Words are runs of letters, digits and underscores, compared case-folded
+_TOKEN = re.compile(r"\w+")
+
+# A word in the title counts this many times as much as one in the description
+TITLE_WEIGHT = 3
+
+# BM25 parameters: how fast repeated words stop adding to the score, and how much
+# longer texts are penalised
+_K1 = 1.2
+_B = 0.75
+
+# =========================
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into case-folded words.
+    """
+    return _TOKEN.findall(text.casefold()) if text else []
+
+# =========================
+
+class TextIndex:
+    """
+    Inverted index over the titles and descriptions of to-do lists.
+    - Maps every word to the IDs of the to-do lists containing it, with the word's weighted
+      count in each (title words count TITLE_WEIGHT times).
+    - Keeps the words in a sorted list, so a prefix is expanded with a binary search.
+    - Updated one to-do list at a time on add and remove; nothing is ever rebuilt.
+    - Queries match every term (AND); a term ending in "*" matches any word starting with it.
+      Results are ranked by BM25.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        # Sorted list of every indexed word
+        self.words: List[str] = []
+        # Weighted word counts and total length of every indexed to-do list
+        self.documents: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def add(self, lst_id: str, title: str, description: Optional[str]):
+        """
+        Index a to-do list's title and description.
+        """
+        counts: Dict[str, int] = {}
+        for word in tokenize(title):
+            counts[word] = counts.get(word, 0) + TITLE_WEIGHT
+        for word in tokenize(description):
+            counts[word] = counts.get(word, 0) + 1
+        self.documents[lst_id] = counts
+        length = sum(counts.values())
+        self.lengths[lst_id] = length
+        self.total_length += length
+        for word, count in counts.items():
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = {}
+                bisect.insort(self.words, word)
+            posting[lst_id] = count
+
+    def remove(self, lst_id: str):
+        """
+        Drop a to-do list from the index.
+        """
+        counts = self.documents.pop(lst_id, None)
+        if counts is None:
+            return
+        self.total_length -= self.lengths.pop(lst_id)
+        for word in counts:
+            posting = self.postings[word]
+            del posting[lst_id]
+            if not posting:
+                del self.postings[word]
+                del self.words[bisect.bisect_left(self.words, word)]
+
+    def _term_counts(self, term: str) -> Dict[str, int]:
+        """
+        Return the weighted count of a query term in every to-do list containing it.
+        - A plain term is one word's postings, returned as they are.
+        - A prefix term ("rep*") merges the postings of every word with the prefix.
+        """
+        if not term.endswith("*"):
+            return self.postings.get(term, {})
+        prefix = term[:-1]
+        start = bisect.bisect_left(self.words, prefix)
+        end = bisect.bisect_left(self.words, prefix + "\U0010ffff")
+        if end - start == 1:
+            return self.postings[self.words[start]]
+        merged: Dict[str, int] = {}
+        for word in self.words[start:end]:
+            for lst_id, count in self.postings[word].items():
+                merged[lst_id] = merged.get(lst_id, 0) + count
+        return merged
+
+    def search(self, query: str, limit: Optional[int] = None) -> Tuple[int, List[str]]:
+        """
+        Return the number of to-do lists matching every term of the query and the IDs of
+        the best limit matches, best first (ties by ID).
+        """
+        terms = []
+        for part in query.split():
+            before = len(terms)
+            terms.extend(tokenize(part))
+            # Only a word from this part becomes a prefix; a bare "*" widens nothing
+            if part.endswith("*") and len(terms) > before:
+                terms[-1] += "*"
+        if not terms:
+            return 0, []
+        term_counts = [self._term_counts(term) for term in terms]
+        if not all(term_counts):
+            return 0, []
+
+        # Intersect, starting from the term with the fewest matches, so only its
+        # to-do lists are looked up in the other terms' counts
+        ordered = sorted(term_counts, key=len)
+        candidates = set(ordered[0])
+        for counts in ordered[1:]:
+            candidates.intersection_update(counts)
+            if not candidates:
+                return 0, []
+
+        # BM25: rarer words and shorter texts score higher
+        documents = len(self.documents)
+        average_length = self.total_length / documents
+        weights = [math.log(1 + (documents - len(counts) + 0.5) / (len(counts) + 0.5)) for counts in term_counts]
+
+        def score(lst_id: str) -> float:
+            norm = _K1 * (1 - _B + _B * self.lengths[lst_id] / average_length)
+            total = 0.0
+            for weight, counts in zip(weights, term_counts):
+                count = counts[lst_id]
+                total += weight * count * (_K1 + 1) / (count + norm)
+            return total
+
+        scored = ((-score(lst_id), lst_id) for lst_id in candidates)
+        best = heapq.nsmallest(limit, scored) if limit is not None else sorted(scored)
+        return len(candidates), [lst_id for _, lst_id in best]
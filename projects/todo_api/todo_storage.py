@@ -0,0 +1,271 @@
+from typing import Iterator, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# =========================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('version', 0);
+"""
+
+# Keeps the row (and so its place in creation order) when a to-do list is updated
+_UPSERT = "INSERT INTO todos (id, data) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET data = excluded.data"
+
+# Seconds to wait before retrying a flush that failed, and how many times a flush is tried
+_RETRY_DELAY = 1.0
+_FLUSH_ATTEMPTS = 3
+
+# =========================
+
+class MemoryEngine:
+    """
+    Storage engine that keeps nothing on disk.
+    - Used by default; the to-do store then lives only in memory, as before.
+    """
+
+    def load(self) -> Tuple[Iterator[str], int]:
+        """
+        Return the stored to-do lists as JSON, in creation order, and the last version used.
+        """
+        return iter(()), 0
+
+    def start(self):
+        """
+        Get ready to accept writes once the stored state has been loaded.
+        """
+
+    def append(self, operations: List[Tuple[str, Optional[str]]], version: int) -> int:
+        """
+        Queue (ID, JSON or None to delete) operations and return a ticket to wait on.
+        """
+        return 0
+
+    async def wait(self, ticket: int):
+        """
+        Wait until the operations behind ticket are committed.
+        """
+
+    def close(self):
+        """
+        Flush anything pending and release files.
+        """
+
+# =========================
+
+class SqliteEngine:
+    """
+    Storage engine that keeps the to-do lists in a local SQLite file.
+    - Writes are queued in memory and committed by a background thread, in one transaction
+      per flush. A flush starts commit_interval seconds after the first queued write, or as
+      soon as batch_size operations are queued.
+    - Many requests therefore share one commit and one fsync (group commit).
+    - Several writes to the same to-do list in one flush are reduced to the last one.
+    - Handlers await the commit covering their write without holding a thread.
+    - On startup every stored to-do list is returned, so reads are served from memory.
+    - A flush that still fails after _FLUSH_ATTEMPTS tries stops the engine: its error is
+      raised to every waiting handler and to every later wait, and nothing more is written,
+      since the file would no longer match the store.
+    """
+
+    def __init__(self, path: str, commit_interval: float = 0.01, batch_size: int = 1000):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # Every commit is fsynced; group commit keeps the number of commits low
+        self.connection.execute("PRAGMA synchronous=FULL")
+        self.connection.executescript(_SCHEMA)
+        # Queued (ID, JSON or None) operations and the highest version among them
+        self.pending: List[Tuple[str, Optional[str]]] = []
+        self.pending_version = 0
+        # Every append gets the next ticket; committed is the highest ticket on disk
+        self.written = 0
+        self.committed = 0
+        # (ticket, event loop, future) of every coroutine waiting for a commit
+        self.waiters = []
+        self.condition = threading.Condition()
+        self.closing = False
+        self.flusher = None
+        # Error of the flush that gave up; once set, no write can be committed
+        self.error: Optional[BaseException] = None
+
+    def load(self) -> Tuple[Iterator[str], int]:
+        """
+        Return the stored to-do lists as JSON, in creation order, and the last version used.
+        """
+        version = self.connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()[0]
+        rows = self.connection.execute("SELECT data FROM todos ORDER BY rowid").fetchall()
+        logging.info("Loaded %d to-do lists from %s.", len(rows), self.path)
+        return (row[0] for row in rows), version
+
+    def start(self):
+        """
+        Start the background flusher.
+        """
+        self.flusher = threading.Thread(target=self._flush_loop, name="todo-flusher", daemon=True)
+        self.flusher.start()
+
+    def append(self, operations: List[Tuple[str, Optional[str]]], version: int) -> int:
+        """
+        Queue (ID, JSON or None to delete) operations and return a ticket to wait on.
+        - version: The store's version counter after these operations.
+        """
+        with self.condition:
+            if self.error is not None:
+                # Nothing will commit these; wait raises the error to the caller
+                self.written += 1
+                return self.written
+            self.pending.extend(operations)
+            self.pending_version = max(self.pending_version, version)
+            self.written += 1
+            # Wake the flusher for the first operation of a flush and when the batch is full
+            if len(self.pending) == len(operations) or len(self.pending) >= self.batch_size:
+                self.condition.notify_all()
+            return self.written
+
+    async def wait(self, ticket: int):
+        """
+        Wait until the operations behind ticket are committed.
+        - Raises the flusher's error if they never will be.
+        """
+        loop = asyncio.get_running_loop()
+        with self.condition:
+            if self.committed >= ticket:
+                return
+            if self.error is not None:
+                raise self.error
+            future = loop.create_future()
+            self.waiters.append((ticket, loop, future))
+        await future
+
+    def _flush_loop(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closing:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                # Give other writers commit_interval to join this flush, unless the batch fills up
+                deadline = time.monotonic() + self.commit_interval
+                while len(self.pending) < self.batch_size and not self.closing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                operations, self.pending = self.pending, []
+                version, ticket = self.pending_version, self.written
+            error = self._commit_with_retries(operations, version)
+            if error is not None:
+                self._fail(error)
+                return
+            with self.condition:
+                self.committed = ticket
+                ready = [waiter for waiter in self.waiters if waiter[0] <= ticket]
+                self.waiters = [waiter for waiter in self.waiters if waiter[0] > ticket]
+                self.condition.notify_all()
+            for _, loop, future in ready:
+                try:
+                    loop.call_soon_threadsafe(_resolve, future)
+                except RuntimeError:
+                    # The waiter's event loop has already closed
+                    pass
+
+    def _commit_with_retries(self, operations: List[Tuple[str, Optional[str]]], version: int) -> Optional[BaseException]:
+        """
+        Commit a batch, retrying SQLite errors up to _FLUSH_ATTEMPTS times in all.
+        - Returns None once committed, or the last error if the batch could not be committed.
+        """
+        for attempt in range(1, _FLUSH_ATTEMPTS + 1):
+            try:
+                self._commit(operations, version)
+                return None
+            except sqlite3.Error as error:
+                if attempt == _FLUSH_ATTEMPTS:
+                    logging.exception("Failed to commit %d to-do list writes; giving up.", len(operations))
+                    return error
+                logging.exception("Failed to commit %d to-do list writes; retrying.", len(operations))
+                time.sleep(_RETRY_DELAY)
+            except Exception as error:
+                logging.exception("Failed to commit %d to-do list writes.", len(operations))
+                return error
+
+    def _fail(self, error: BaseException):
+        """
+        Stop accepting writes and raise error to every coroutine waiting for a commit.
+        """
+        with self.condition:
+            self.error = error
+            self.pending = []
+            failed, self.waiters = self.waiters, []
+            self.condition.notify_all()
+        for _, loop, future in failed:
+            try:
+                loop.call_soon_threadsafe(_reject, future, error)
+            except RuntimeError:
+                # The waiter's event loop has already closed
+                pass
+
+    def _commit(self, operations: List[Tuple[str, Optional[str]]], version: int):
+        """
+        Write a batch of operations and the version counter in one transaction.
+        """
+        # Only the last operation on each to-do list matters, but a to-do list deleted and
+        # created again is deleted first, so it moves to the end of the creation order
+        latest = dict(operations)
+        deleted = {lst_id for lst_id, data in operations if data is None}
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.executemany("DELETE FROM todos WHERE id = ?", [(lst_id,) for lst_id in deleted])
+            self.connection.executemany(_UPSERT, [(lst_id, data) for lst_id, data in latest.items() if data is not None])
+            self.connection.execute("UPDATE meta SET value = ? WHERE name = 'version'", (version,))
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        """
+        Commit everything queued, stop the flusher and close the database.
+        """
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        if self.flusher is not None:
+            self.flusher.join()
+        self.connection.close()
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+def _reject(future: asyncio.Future, error: BaseException):
+    if not future.done():
+        future.set_exception(error)
+
+# =========================
+
+def open_engine():
+    """
+    Create the storage engine selected by environment variables.
+    - TODO_STORAGE: "memory" (default) or "sqlite".
+    - TODO_DB_PATH: SQLite file (default ./todo.db).
+    - TODO_COMMIT_INTERVAL_MS: how long a flush waits for more writes, in milliseconds (default 10).
+    - TODO_COMMIT_BATCH: number of queued operations that starts a flush at once (default 1000).
+    """
+    storage = os.environ.get("TODO_STORAGE", "memory")
+    if storage == "memory":
+        return MemoryEngine()
+    if storage == "sqlite":
+        return SqliteEngine(
+            os.environ.get("TODO_DB_PATH", "./todo.db"),
+            commit_interval=float(os.environ.get("TODO_COMMIT_INTERVAL_MS", "10")) / 1000,
+            batch_size=int(os.environ.get("TODO_COMMIT_BATCH", "1000")),
+        )
+    raise ValueError(f"Unknown TODO_STORAGE {storage!r}; expected 'memory' or 'sqlite'.")
@@ -0,0 +1,403 @@
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+from todo_search import TextIndex
+from todo_storage import MemoryEngine
+import bisect
+import datetime
+import threading
+
+# =========================
+
+# Order of priorities in the schedule: high first, to-do lists without a priority last
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2, None: 3}
+
+# Status of to-do lists that are finished and no longer scheduled
+COMPLETED = "completed"
+
+# =========================
+
+class VersionConflict(Exception):
+    """
+    Raised by a conditional write when the stored to-do list's version is not one the caller expected.
+    """
+
+    def __init__(self, current):
+        super().__init__(current.id)
+        # The to-do list as it is stored
+        self.current = current
+
+# =========================
+
+class ToDoStore:
+    """
+    In-memory storage for to-do lists.
+    - To-do lists are stored in a dictionary keyed by ID.
+    - A sorted schedule of (due date, priority rank, ID) entries holds every open (not completed)
+      to-do list, so the next ones due are found with a binary search and a slice.
+    - Every to-do list is also kept in a bucket for its (status, priority) pair. The buckets
+      answer status and priority filters without a scan, and their sizes are live counters.
+    - A full-text index over titles and descriptions answers keyword searches (see todo_search).
+    - The schedule, the buckets and the text index are updated on add, replace and remove.
+    - Every write stamps the to-do list with a new version from a store-wide counter, so a
+      version is never reused, even by a to-do list deleted and created again under the same ID.
+    - Writes can be made conditional on the stored version (if_match); the check and the
+      write happen under one lock, so concurrent editors cannot overwrite each other unseen.
+    - Every write is queued on a storage engine (see todo_storage); await flushed() before
+      reporting a write as done. Reads never touch the engine.
+    - Old completed to-do lists can be moved out to an archive (see todo_archive) with
+      completed_before() and evict(), so the store only holds active work.
+    """
+
+    def __init__(self, model, engine=None):
+        # Model class of the stored to-do lists, used when loading them
+        self.model = model
+        # Storage engine that persists writes; defaults to keeping nothing on disk
+        self.engine = engine if engine is not None else MemoryEngine()
+        # Ticket of the most recent write queued on the engine
+        self.ticket = 0
+        self.records: Dict = {}
+        # (due date ordinal, priority rank, ID) of every open to-do list, in order
+        self.schedule: List[Tuple[int, int, str]] = []
+        # IDs of the to-do lists with each (status, priority) pair, in insertion order
+        self.buckets: Dict[Tuple[str, Optional[str]], Dict[str, None]] = {}
+        # Inverted index of the words in titles and descriptions
+        self.text = TextIndex()
+        # Version given to the most recent write
+        self.version = 0
+        # Lock held while a write updates the records, the schedule and the buckets together
+        self.lock = threading.RLock()
+
+    # =========================
+
+    # Loading and persistence
+
+    def load(self):
+        """
+        Load the engine's stored to-do lists, index them and start accepting writes.
+        """
+        with self.lock:
+            rows, self.version = self.engine.load()
+            for row in rows:
+                lst = self.model.model_validate_json(row)
+                self.records[lst.id] = lst
+                self._index(lst)
+            self.engine.start()
+
+    def _log(self, operations: List[Tuple[str, Optional[str]]]):
+        """
+        Queue (ID, JSON or None to delete) operations on the engine (write lock must be held).
+        """
+        self.ticket = self.engine.append(operations, self.version)
+
+    async def flushed(self):
+        """
+        Wait until every write made so far is committed by the engine.
+        """
+        await self.engine.wait(self.ticket)
+
+    def close(self):
+        """
+        Commit every queued write and close the storage engine.
+        """
+        self.engine.close()
+
+    # =========================
+
+    # Read access in the style of a dictionary
+
+    def __contains__(self, lst_id: str) -> bool:
+        return lst_id in self.records
+
+    def __getitem__(self, lst_id: str):
+        return self.records[lst_id]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, lst_id: str, default=None):
+        return self.records.get(lst_id, default)
+
+    def values(self):
+        return list(self.records.values())
+
+    # =========================
+
+    # Writes
+
+    def add(self, lst):
+        """
+        Add a new to-do list, schedule it if it is open and return it with its version.
+        """
+        with self.lock:
+            lst = self._stamp(lst, {})
+            self.records[lst.id] = lst
+            self._index(lst)
+            self._log([(lst.id, lst.model_dump_json())])
+            return lst
+
+    def add_many(self, lists: List) -> Tuple[List[Tuple[int, str, str]], List]:
+        """
+        Add a batch of new to-do lists, all or nothing.
+        - Checks every ID against the store and against the rest of the batch under the lock.
+        - If any ID conflicts, nothing is added and the conflicts are returned as
+          (position in batch, ID, reason) tuples with an empty list of to-do lists.
+        - Otherwise every to-do list is added and queued on the engine as one write, and no
+          conflicts are returned with the added to-do lists and their versions.
+        """
+        with self.lock:
+            conflicts = []
+            seen = set()
+            for position, lst in enumerate(lists):
+                if lst.id in self.records:
+                    conflicts.append((position, lst.id, f"ToDoList ID {lst.id} already exists."))
+                elif lst.id in seen:
+                    conflicts.append((position, lst.id, f"ToDoList ID {lst.id} is repeated in the batch."))
+                seen.add(lst.id)
+            if conflicts:
+                return conflicts, []
+            added = [self._stamp(lst, {}) for lst in lists]
+            for lst in added:
+                self.records[lst.id] = lst
+                self._index(lst)
+            self._log([(lst.id, lst.model_dump_json()) for lst in added])
+            return [], added
+
+    def replace(self, lst_id: str, lst, if_match: Optional[Collection[int]] = None):
+        """
+        Replace the to-do list stored under lst_id, reschedule it and return it with its new version.
+        - The stored copy always has lst_id as its ID, whatever ID lst has.
+        - if_match: Versions the stored to-do list may have; raises VersionConflict otherwise.
+        - Raises KeyError if there is no to-do list with this ID.
+        """
+        with self.lock:
+            return self._put(lst_id, lst, {}, if_match)
+
+    def patch(self, lst_id: str, fields: dict, if_match: Optional[Collection[int]] = None):
+        """
+        Merge fields (already validated) into the stored to-do list and return it with its new version.
+        - if_match: Versions the stored to-do list may have; raises VersionConflict otherwise.
+        - Raises KeyError if there is no to-do list with this ID.
+        """
+        with self.lock:
+            return self._put(lst_id, self.records[lst_id], fields, if_match)
+
+    def remove(self, lst_id: str, if_match: Optional[Collection[int]] = None):
+        """
+        Remove and return the to-do list stored under lst_id.
+        - if_match: Versions the stored to-do list may have; raises VersionConflict otherwise.
+        """
+        with self.lock:
+            self._check_version(self.records[lst_id], if_match)
+            lst = self.records.pop(lst_id)
+            self._unindex(lst)
+            self._log([(lst_id, None)])
+            return lst
+
+    def evict(self, lists: List) -> List:
+        """
+        Remove to-do lists that have been archived and return those removed.
+        - A to-do list is only removed if it has not been written since it was read, i.e. the
+          stored object is the one given.
+        """
+        with self.lock:
+            evicted = [lst for lst in lists if self.records.get(lst.id) is lst]
+            for lst in evicted:
+                del self.records[lst.id]
+                self._unindex(lst)
+            if evicted:
+                self._log([(lst.id, None) for lst in evicted])
+            return evicted
+
+    def _put(self, lst_id: str, lst, fields: dict, if_match: Optional[Collection[int]]):
+        old = self.records[lst_id]
+        self._check_version(old, if_match)
+        # The path's ID wins over any ID in the body, so the indexes stay keyed like the records
+        lst = self._stamp(lst, {**fields, "id": lst_id})
+        # Re-indexing the words is the costly part of an update, so skip it when they are unchanged
+        text_changed = (old.title, old.description) != (lst.title, lst.description)
+        self._unindex(old, text=text_changed)
+        self.records[lst_id] = lst
+        self._index(lst, text=text_changed)
+        self._log([(lst_id, lst.model_dump_json())])
+        return lst
+
+    def _stamp(self, lst, fields: dict):
+        """
+        Return a copy of a to-do list with fields applied and the next version.
+        """
+        self.version += 1
+        return lst.model_copy(update={**fields, "version": self.version})
+
+    @staticmethod
+    def _check_version(lst, if_match: Optional[Collection[int]]):
+        if if_match is not None and lst.version not in if_match:
+            raise VersionConflict(lst)
+
+    def _index(self, lst, text: bool = True):
+        """
+        Add a to-do list to its bucket, its words to the text index and, if it is open, to the schedule.
+        - text: Whether to index the words; False when they have not changed.
+        """
+        if text:
+            self.text.add(lst.id, lst.title, lst.description)
+        self.buckets.setdefault(_bucket_key(lst), {})[lst.id] = None
+        if lst.status != COMPLETED:
+            bisect.insort(self.schedule, _schedule_key(lst))
+
+    def _unindex(self, lst, text: bool = True):
+        """
+        Remove a to-do list from its bucket, the text index and the schedule.
+        - text: Whether to remove its words; False when they have not changed.
+        """
+        if text:
+            self.text.remove(lst.id)
+        bucket_key = _bucket_key(lst)
+        bucket = self.buckets[bucket_key]
+        del bucket[lst.id]
+        if not bucket:
+            del self.buckets[bucket_key]
+        if lst.status != COMPLETED:
+            key = _schedule_key(lst)
+            position = bisect.bisect_left(self.schedule, key)
+            if position < len(self.schedule) and self.schedule[position] == key:
+                del self.schedule[position]
+
+    # =========================
+
+    # Queries
+
+    def _matching_buckets(self, status: Optional[str], priority: Optional[str]) -> List[Dict[str, None]]:
+        return [
+            bucket for (bucket_status, bucket_priority), bucket in self.buckets.items()
+            if (status is None or bucket_status == status) and (priority is None or bucket_priority == priority)
+        ]
+
+    def count(self, status: Optional[str] = None, priority: Optional[str] = None) -> int:
+        """
+        Return how many to-do lists have the given status and priority (either may be None for any).
+        - Adds up bucket sizes; never looks at the to-do lists themselves.
+        """
+        with self.lock:
+            return sum(len(bucket) for bucket in self._matching_buckets(_value(status), _value(priority)))
+
+    def counts(self) -> Dict[Tuple[str, Optional[str]], int]:
+        """
+        Return the number of to-do lists for every (status, priority) pair that has any.
+        """
+        with self.lock:
+            return {key: len(bucket) for key, bucket in self.buckets.items()}
+
+    def select(
+        self,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        sort: Optional[str] = None,
+        descending: bool = False,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Tuple[int, List]:
+        """
+        Return the number of matching to-do lists and one page of them.
+        - status, priority: Only to-do lists in the matching buckets.
+        - sort: The field to order by; ties are ordered by ID. Without it, to-do lists are in
+          the order they were added.
+        - offset, limit: The page of the ordered matches to return.
+        """
+        with self.lock:
+            buckets = self._matching_buckets(_value(status), _value(priority))
+            total = sum(len(bucket) for bucket in buckets)
+            if status is None and priority is None:
+                ids: Iterable[str] = self.records
+            elif len(buckets) == 1:
+                ids = buckets[0]
+            else:
+                matching = set().union(*buckets)
+                # Several buckets: without a sort, keep the order the to-do lists were added in
+                ids = matching if sort is not None else [lst_id for lst_id in self.records if lst_id in matching]
+            lists = [self.records[lst_id] for lst_id in ids]
+        if sort is not None:
+            lists.sort(key=_sort_key(sort), reverse=descending)
+        elif descending:
+            lists.reverse()
+        end = None if limit is None else offset + limit
+        return total, lists[offset:end]
+
+    def search(self, query: str, limit: Optional[int] = None) -> Tuple[int, List]:
+        """
+        Return the number of to-do lists whose title or description contains every term of
+        the query, and the best limit matches, best first.
+        - A term ending in "*" matches any word starting with it.
+        """
+        with self.lock:
+            count, ids = self.text.search(query, limit)
+            return count, [self.records[lst_id] for lst_id in ids]
+
+    def completed_before(self, day: datetime.date, limit: int) -> List:
+        """
+        Return up to limit completed to-do lists whose completion date is before day.
+        - Only the completed buckets are scanned.
+        """
+        with self.lock:
+            found = []
+            for bucket in self._matching_buckets(COMPLETED, None):
+                for lst_id in bucket:
+                    lst = self.records[lst_id]
+                    if completed_on(lst) < day:
+                        found.append(lst)
+                        if len(found) == limit:
+                            return found
+            return found
+
+    def due(self, before: Optional[datetime.date] = None, limit: Optional[int] = None,
+            after: Optional[datetime.date] = None) -> List:
+        """
+        Return open to-do lists in schedule order: earliest due date first, then highest priority.
+        - before: Only to-do lists due on or before this date.
+        - after: Only to-do lists due on or after this date.
+        - limit: The maximum number to return.
+        - Costs O(log n + k) for k results.
+        """
+        with self.lock:
+            start = 0 if after is None else bisect.bisect_left(self.schedule, (after.toordinal(),))
+            end = len(self.schedule) if before is None else bisect.bisect_left(self.schedule, (before.toordinal() + 1,))
+            if limit is not None:
+                end = min(end, start + limit)
+            return [self.records[lst_id] for _, _, lst_id in self.schedule[start:end]]
+
+    def overdue(self, today: datetime.date, limit: Optional[int] = None) -> List:
+        """
+        Return open to-do lists due before today, in schedule order.
+        """
+        return self.due(before=today - datetime.timedelta(days=1), limit=limit)
+
+# =========================
+
+def _value(enum) -> Optional[str]:
+    """
+    Return the value of an enum member, or the argument itself if it is a plain string or None.
+    """
+    return getattr(enum, "value", enum)
+
+def completed_on(lst) -> datetime.date:
+    """
+    Return the date a completed to-do list was completed: when it was last updated, or
+    created if it never was.
+    """
+    return lst.last_updated_date or lst.creation_date
+
+def _bucket_key(lst) -> Tuple[str, Optional[str]]:
+    return (_value(lst.status), _value(lst.priority))
+
+def _schedule_key(lst) -> Tuple[int, int, str]:
+    return (lst.due_date.toordinal(), PRIORITY_RANK[_value(lst.priority)], lst.id)
+
+def _sort_key(field: str):
+    """
+    Return a sort key function for a to-do list field.
+    - Priorities sort high, medium, low; missing values sort last. Ties are ordered by ID.
+    """
+    if field == "priority":
+        return lambda lst: (PRIORITY_RANK[_value(lst.priority)], lst.id)
+    def key(lst):
+        value = _value(getattr(lst, field))
+        return (value is None, value if value is not None else "", lst.id)
+    return key
@@ -0,0 +1,141 @@
+# import the modules needed to time the engine profiles
+# the benchmark uses its own database files, so vehicle.db is never touched
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from vehicleDB import ENGINE_PROFILES, VehicleDB, create_db_engine, init_db
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+
+# ==============================
+
+# function to make a vehicle row with random values
+def make_vehicle(rng: random.Random) -> VehicleDB:
+    return VehicleDB(
+        id=str(uuid.UUID(int=rng.getrandbits(128))),
+        make=rng.choice(["Ford", "Toyota", "Honda", "BMW", "Audi"]),
+        model=rng.choice(["A", "B", "C", "D"]),
+        year=rng.randint(1990, 2025),
+        licence_plate=f"{rng.randint(0, 99_999):05d}",
+        colour=rng.choice(["red", "blue", "black", "white"]),
+        mileage=rng.randint(0, 300_000),
+        available=True,
+        quantity=1,
+    )
+
+# ==============================
+
+# function to time single-row inserts, each in its own commit, from one thread
+# this is what POST /vehicles does, so it shows the cost of a commit under each profile
+def measure_commits(Session, count: int, rng: random.Random) -> tuple:
+    ids = []
+    started = time.perf_counter()
+    for _ in range(count):
+        with Session() as db:
+            vehicle = make_vehicle(rng)
+            db.add(vehicle)
+            db.commit()
+            ids.append(vehicle.id)
+    duration = time.perf_counter() - started
+    return ids, {"commits": count, "commits_per_s": round(count / duration, 1)}
+
+# function to run reader threads and writer threads at the same time for a number of seconds
+# readers fetch random vehicles by ID, like GET /vehicles/{id}; writers insert, like POST /vehicles
+# "database is locked" errors are counted, which is what happens when writers block readers
+def measure_mixed(Session, ids: list, readers: int, writers: int, seconds: float, seed: int) -> dict:
+    counts = {"reads": 0, "writes": 0, "locked_errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def reader(number: int):
+        rng = random.Random(seed + number)
+        done = 0
+        while time.perf_counter() < deadline:
+            with Session() as db:
+                db.execute(select(VehicleDB).where(VehicleDB.id == rng.choice(ids))).scalar_one_or_none()
+            done += 1
+        with lock:
+            counts["reads"] += done
+
+    def writer(number: int):
+        rng = random.Random(seed + 1000 + number)
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            try:
+                with Session() as db:
+                    db.add(make_vehicle(rng))
+                    db.commit()
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts["writes"] += done
+            counts["locked_errors"] += errors
+
+    threads = [threading.Thread(target=reader, args=(number,)) for number in range(readers)]
+    threads += [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        "reads_per_s": round(counts["reads"] / seconds, 1),
+        "writes_per_s": round(counts["writes"] / seconds, 1),
+        "locked_errors": counts["locked_errors"],
+    }
+
+# ==============================
+
+# function to benchmark one profile in a fresh database
+def run_profile(name: str, args, directory: str) -> dict:
+    url = None
+    if ENGINE_PROFILES[name]["url"] != "sqlite://":
+        url = f"sqlite:///{os.path.join(directory, name + '.db')}"
+    engine = create_db_engine(name, url=url)
+    init_db(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    rng = random.Random(args.seed)
+    ids, commits = measure_commits(Session, args.commits, rng)
+    result = {"profile": name, **commits}
+    # a profile with one shared connection cannot run transactions from several threads at once
+    if isinstance(engine.pool, StaticPool):
+        print(f"{name:<16} {result['commits_per_s']:>10.1f} commits/s  mixed: skipped (one shared connection)")
+    else:
+        result.update(measure_mixed(Session, ids, args.readers, args.writers, args.seconds, args.seed))
+        print(f"{name:<16} {result['commits_per_s']:>10.1f} commits/s  "
+              f"mixed: {result['reads_per_s']:>9.1f} reads/s {result['writes_per_s']:>8.1f} writes/s  "
+              f"locked errors {result['locked_errors']:>4}")
+    engine.dispose()
+    return result
+
+# main function to compare the engine profiles
+def main():
+    parser = argparse.ArgumentParser(description="Compare the vehicle database engine profiles.")
+    parser.add_argument("--profiles", default=",".join(ENGINE_PROFILES), help="comma-separated profile names")
+    parser.add_argument("--commits", type=int, default=500, help="single-row commits to time")
+    parser.add_argument("--readers", type=int, default=8, help="reader threads in the mixed phase")
+    parser.add_argument("--writers", type=int, default=2, help="writer threads in the mixed phase")
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of the mixed phase")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", default="db_benchmark_results.json", help="file to write results to")
+    args = parser.parse_args()
+
+    # every profile gets its own database files in a temporary directory
+    with tempfile.TemporaryDirectory() as directory:
+        results = [run_profile(name, args, directory) for name in args.profiles.split(",")]
+    with open(args.output, "w") as output:
+        json.dump({"readers": args.readers, "writers": args.writers, "results": results}, output, indent=2)
+    print("Results written to", args.output)
+
+# ==============================
+
+# run the benchmark when this script is executed directly
+if __name__ == "__main__":
+    main()
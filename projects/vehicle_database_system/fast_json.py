@@ -0,0 +1,31 @@
+# import the response classes from FastAPI and the pydantic-core encoder
+# pydantic-core is installed with pydantic and writes JSON in Rust
+from typing import Any
+from fastapi.responses import JSONResponse
+import os
+import pydantic_core
+
+# ==============================
+
+# whether handlers send their results through FastJSONResponse
+# off unless FAST_JSON=1, so responses are validated against response_model as before
+enabled = os.environ.get("FAST_JSON", "0") == "1"
+
+# ==============================
+
+# define a JSON response that is encoded straight to bytes by pydantic-core
+# dictionaries, lists, dates and models are written in one pass, without json.dumps
+# nothing is validated, so only return data that was validated when it was stored
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return pydantic_core.to_json(content)
+
+# ==============================
+
+# function to return content as a FastJSONResponse when the fast path is enabled
+# FastAPI sends a returned Response without checking it against response_model, so this
+# skips re-validating rows that came from the database; otherwise content is returned as is
+def fast_json(content: Any, status_code: int = 200):
+    if not enabled:
+        return content
+    return FastJSONResponse(content, status_code=status_code)
@@ -1,8 +1,10 @@
 # import necessary modules from FastAPI, SQLAlchemy, and other libraries
 from fastapi import FastAPI, HTTPException, Depends
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from vehicleDB import VehicleDB, init_db, get_db
 from vehicleModel import VehicleCreate, VehicleResponse
+from fast_json import fast_json
 import uuid
 
 # ==============================
@@ -13,6 +15,8 @@ init_db()
 
 # create an instance of the FastAPI application
 # this is the main object that will handle incoming requests and route them to the correct functions
+# set FAST_JSON=1 to send the vehicle list with fast_json, which encodes it without re-validating
+# every row against response_model (see fast_json); single vehicles are returned as before
 app = FastAPI()
 
 # ==============================
@@ -49,8 +53,9 @@ async def create_vehicle(vehicle: VehicleCreate, db: Session = Depends(get_db)):
 @app.get("/vehicles", response_model=list[VehicleResponse])
 def get_vehicles(db: Session = Depends(get_db)):
     # query the database for all vehicles
-    vehicles = db.query(VehicleDB).all()
-    return vehicles  # return the list of vehicles
+    # plain rows are read instead of ORM objects, since only their columns are returned
+    vehicles = db.execute(select(VehicleDB.__table__)).mappings().all()
+    return fast_json([dict(vehicle) for vehicle in vehicles])  # return the list of vehicles
 
 # ==============================
 
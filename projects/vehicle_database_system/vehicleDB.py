@@ -1,18 +1,100 @@
 # import necessary functions and classes from SQLAlchemy
 # SQLAlchemy is used to interact with databases in Python
-from sqlalchemy import create_engine, Column, String, Integer, Boolean
+from sqlalchemy import create_engine, event, Column, String, Integer, Boolean
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from typing import Optional
+import os
 
 # ==============================
 
 # URL for connecting to the database
 # we're using SQLite, a lightweight database, for simplicity
-DATABASE_URL = "sqlite:///./vehicle.db"
+# set VEHICLE_DB_URL to use another file
+DATABASE_URL = os.environ.get("VEHICLE_DB_URL", "sqlite:///./vehicle.db")
+
+# named engine profiles, chosen with the VEHICLE_DB_PROFILE environment variable
+# each profile sets the SQLite pragmas run on every new connection and the connection pool
+# - journal_mode WAL lets readers carry on while a write is committed, instead of blocking
+# - synchronous FULL fsyncs every commit; NORMAL only fsyncs at WAL checkpoints, so a power
+#   cut can lose the last commits but never corrupts the database
+# - mmap_size lets SQLite read pages through memory mapping instead of read() calls
+# - cache_size is the page cache per connection; negative values are in KiB
+# - busy_timeout makes a connection wait this many milliseconds for a lock instead of failing
+# - the pool keeps enough connections for FastAPI's thread pool (40 threads by default)
+ENGINE_PROFILES = {
+    # safe default: every commit is on disk before the request returns
+    "durable": {
+        "url": DATABASE_URL,
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "FULL",
+            "mmap_size": 64 * 1024 * 1024,
+            "cache_size": -16000,
+            "busy_timeout": 5000,
+        },
+        "pool": {"pool_size": 10, "max_overflow": 30, "pool_timeout": 30, "pool_pre_ping": False},
+    },
+    # faster writes for data that can be rebuilt: commits are not fsynced one by one
+    "throughput": {
+        "url": DATABASE_URL,
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64000,
+            "busy_timeout": 5000,
+            "temp_store": "MEMORY",
+        },
+        "pool": {"pool_size": 20, "max_overflow": 20, "pool_timeout": 30, "pool_pre_ping": False},
+    },
+    # the settings used before profiles existed: rollback journal, SQLite's defaults, default pool
+    # kept for comparison in db_benchmark
+    "legacy": {
+        "url": DATABASE_URL,
+        "pragmas": {},
+        "pool": {},
+    },
+    # for tests: one private in-memory database, shared by every thread through one connection
+    "test-in-memory": {
+        "url": "sqlite://",
+        "pragmas": {"journal_mode": "MEMORY", "synchronous": "OFF"},
+        "pool": {"poolclass": StaticPool},
+    },
+}
+
+# ==============================
+
+# function to create the database engine for a named profile
+# the profile's pragmas are set through a connect event, so every pooled connection gets them
+def create_db_engine(profile: Optional[str] = None, url: Optional[str] = None) -> Engine:
+    # use the profile from the environment if none is given
+    name = profile or os.environ.get("VEHICLE_DB_PROFILE", "durable")
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown vehicle database profile {name!r}; expected one of {', '.join(ENGINE_PROFILES)}.")
+    settings = ENGINE_PROFILES[name]
+    # connections are handed between FastAPI's worker threads by the pool
+    new_engine = create_engine(
+        url or settings["url"],
+        connect_args={"check_same_thread": False},
+        **settings["pool"],
+    )
+
+    # run the profile's pragmas on every new connection
+    @event.listens_for(new_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in settings["pragmas"].items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+    return new_engine
 
 # create an engine that connects to the SQLite database
 # the engine is the starting point for any SQLAlchemy application
-engine = create_engine(DATABASE_URL)
+engine = create_db_engine()
 
 # create a session maker to handle database transactions
 # this session maker will be used to create new database sessions
@@ -46,8 +128,9 @@ class VehicleDB(Base):
 
 # function to initialize the database
 # this function creates all tables defined in the Base metadata
-def init_db():
-    Base.metadata.create_all(bind=engine)
+# target is the engine to create them in; the application's engine by default
+def init_db(target: Optional[Engine] = None):
+    Base.metadata.create_all(bind=target or engine)
 
 # ==============================
 